@@ -2,22 +2,106 @@
 Script per analizzare le rampe nel G-code processato
 """
 
+import mmap
+import os
 import re
 import sys
+from array import array
+from enum import IntEnum
+
+import numpy as np
+
+# Pattern precompilati per il parsing delle linee
+LENGTH_PATTERN = re.compile(rb"length=(\d+\.\d+)mm")
+RAMP_UP_LENGTH_PATTERN = re.compile(rb"up=(\d+\.\d+)mm")
+RAMP_DOWN_LENGTH_PATTERN = re.compile(rb"down=(\d+\.\d+)mm")
+RAMP_UP_PATTERN = re.compile(rb"RAMP_UP (\d+)%")
+RAMP_DOWN_PATTERN = re.compile(rb"RAMP_DOWN (\d+)%")
+
+
+class Phase(IntEnum):
+    """Fase di un movimento all'interno di un percorso smoothed."""
+    STEADY = 0
+    RAMP_UP = 1
+    RAMP_DOWN = 2
+
+
+def _new_columns() -> tuple:
+    """Crea le colonne tipizzate per i movimenti di un percorso."""
+    # x, y, fase, speed factor (%)
+    return array("d"), array("d"), array("b"), array("h")
+
 
 def analyze_ramps(filepath: str):
     """Analizza le rampe in un file G-code processato."""
     
     in_smoothing = False
     current_path = None
+    paths_analyzed = 0
+    xs, ys, phases, speeds = _new_columns()
+    
+    # mmap non può mappare un file vuoto
+    if os.path.getsize(filepath) == 0:
+        return
     
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
+    # Mappa il file in memoria e scandisce i byte senza decodifica
+    with open(filepath, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for line in iter(mm.readline, b""):
+            # Niente strip(): il G-code generato non ha spazi iniziali e il
+            # newline finale non altera prefissi, token e ricerche nei commenti
             
-            if "PRESSURE_SMOOTHING_START" in line:
+            # Prefiltro: la gran parte delle linee sono movimenti G1
+            if line.startswith(b"G1"):
+                if not (in_smoothing and current_path):
+                    continue
+                
+                # Parametri nel codice, fase nel commento
+                code, _, comment = line.partition(b";")
+                
+                # Estrai info movimento
+                params = {}
+                # I token G-code sono separati da spazi: basta la prima lettera
+                for token in code.split():
+                    key = token[:1]
+                    if key in b"XYZEF":
+                        try:
+                            params[key] = float(token[1:])
+                        except ValueError:
+                            pass
+                
+                # Estrai fase e speed factor dal commento
+                phase = Phase.STEADY
+                speed = 100
+                if b"RAMP_UP" in comment:
+                    phase = Phase.RAMP_UP
+                    match = RAMP_UP_PATTERN.search(comment)
+                    if match:
+                        speed = int(match.group(1))
+                elif b"RAMP_DOWN" in comment:
+                    phase = Phase.RAMP_DOWN
+                    match = RAMP_DOWN_PATTERN.search(comment)
+                    if match:
+                        speed = int(match.group(1))
+                
+                # Assi non specificati mantengono la posizione precedente
+                if len(xs) > 0:
+                    xs.append(params.get(b"X", xs[-1]))
+                    ys.append(params.get(b"Y", ys[-1]))
+                else:
+                    xs.append(params.get(b"X", 0))
+                    ys.append(params.get(b"Y", 0))
+                phases.append(phase)
+                speeds.append(speed)
+                continue
+            
+            # I marker di smoothing compaiono solo nelle linee di commento
+            if not line.startswith(b";"):
+                continue
+            
+            if b"PRESSURE_SMOOTHING_START" in line:
                 # Estrai lunghezza percorso
-                match = re.search(r"length=(\d+\.\d+)mm", line)
+                match = LENGTH_PATTERN.search(line)
                 if match:
                     path_length = float(match.group(1))
                     current_path = {
@@ -26,37 +110,44 @@ def analyze_ramps(filepath: str):
                         "ramp_down_length": 0,
                         "steady_length": 0,
                         "ramp_up_dist": 0,
-                        "ramp_down_dist": 0,
-                        "moves": []
+                        "ramp_down_dist": 0
                     }
+                    xs, ys, phases, speeds = _new_columns()
                     in_smoothing = True
                     print(f"\n{'='*60}")
                     print(f"PERCORSO: {path_length:.2f}mm")
             
-            elif "Ramps:" in line and current_path:
+            elif b"Ramps:" in line and current_path:
                 # Estrai lunghezze rampe configurate
-                match_up = re.search(r"up=(\d+\.\d+)mm", line)
-                match_down = re.search(r"down=(\d+\.\d+)mm", line)
+                match_up = RAMP_UP_LENGTH_PATTERN.search(line)
+                match_down = RAMP_DOWN_LENGTH_PATTERN.search(line)
                 if match_up and match_down:
                     current_path["config_ramp_up"] = float(match_up.group(1))
                     current_path["config_ramp_down"] = float(match_down.group(1))
                     print(f"Config: ramp-up={current_path['config_ramp_up']:.2f}mm, ramp-down={current_path['config_ramp_down']:.2f}mm")
             
-            elif "PRESSURE_SMOOTHING_END" in line and current_path:
+            elif b"PRESSURE_SMOOTHING_END" in line and current_path:
                 # Analizza il percorso
-                print(f"\nMovimenti totali: {len(current_path['moves'])}")
+                n_moves = len(phases)
+                print(f"\nMovimenti totali: {n_moves}")
+                
+                # Lunghezze dei movimenti (approssimate) in un'unica passata
+                x = np.frombuffer(xs, dtype=np.float64)
+                y = np.frombuffer(ys, dtype=np.float64)
+                phase_codes = np.frombuffer(phases, dtype=np.int8)
+                lengths = np.zeros(n_moves)
+                lengths[1:] = np.hypot(np.diff(x), np.diff(y))
                 
                 # Calcola distanze effettive
-                cumulative = 0
-                ramp_up_end = 0
-                ramp_down_start = current_path["length"]
+                cumulative_end = np.cumsum(lengths)
+                is_ramp_up = phase_codes == Phase.RAMP_UP
+                is_ramp_down = phase_codes == Phase.RAMP_DOWN
                 
-                for move in current_path["moves"]:
-                    if move["phase"] == "RAMP_UP":
-                        ramp_up_end = cumulative + move["length"]
-                    if move["phase"] == "RAMP_DOWN" and ramp_down_start == current_path["length"]:
-                        ramp_down_start = cumulative
-                    cumulative += move["length"]
+                ramp_up_end = cumulative_end[is_ramp_up].max() if is_ramp_up.any() else 0
+                ramp_down_start = current_path["length"]
+                if is_ramp_down.any():
+                    first_down = np.argmax(is_ramp_down)
+                    ramp_down_start = cumulative_end[first_down - 1] if first_down > 0 else 0
                 
                 actual_ramp_up = ramp_up_end
                 actual_ramp_down = current_path["length"] - ramp_down_start
@@ -72,60 +163,23 @@ def analyze_ramps(filepath: str):
                 print(f"  Differenza:  {abs(actual_ramp_down - current_path.get('config_ramp_down', 0)):.2f}mm")
                 
                 # Mostra distribuzione speed factor
-                ramp_up_moves = [m for m in current_path["moves"] if m["phase"] == "RAMP_UP"]
-                ramp_down_moves = [m for m in current_path["moves"] if m["phase"] == "RAMP_DOWN"]
+                speed = np.frombuffer(speeds, dtype=np.int16)
+                ramp_up_speeds = speed[is_ramp_up]
+                ramp_down_speeds = speed[is_ramp_down]
                 
-                if ramp_up_moves:
-                    speeds = [m["speed"] for m in ramp_up_moves]
-                    print(f"\nRAMP-UP speed factors: min={min(speeds):.0f}%, max={max(speeds):.0f}%")
+                if ramp_up_speeds.size:
+                    print(f"\nRAMP-UP speed factors: min={ramp_up_speeds.min():.0f}%, max={ramp_up_speeds.max():.0f}%")
                 
-                if ramp_down_moves:
-                    speeds = [m["speed"] for m in ramp_down_moves]
-                    print(f"RAMP-DOWN speed factors: min={min(speeds):.0f}%, max={max(speeds):.0f}%")
+                if ramp_down_speeds.size:
+                    print(f"RAMP-DOWN speed factors: min={ramp_down_speeds.min():.0f}%, max={ramp_down_speeds.max():.0f}%")
                 
                 in_smoothing = False
                 current_path = None
                 
                 # Analizza solo i primi 3 percorsi
-                if len([1 for _ in range(3)]) >= 3:
+                paths_analyzed += 1
+                if paths_analyzed >= 3:
                     break
-            
-            elif in_smoothing and current_path and line.startswith("G1"):
-                # Estrai info movimento
-                params = {}
-                for match in re.finditer(r"([XYZEF])(-?\.?\d+\.?\d*)", line):
-                    params[match.group(1)] = float(match.group(2))
-                
-                # Estrai fase e speed factor dal commento
-                phase = "STEADY"
-                speed = 100
-                if "RAMP_UP" in line:
-                    phase = "RAMP_UP"
-                    match = re.search(r"RAMP_UP (\d+)%", line)
-                    if match:
-                        speed = int(match.group(1))
-                elif "RAMP_DOWN" in line:
-                    phase = "RAMP_DOWN"
-                    match = re.search(r"RAMP_DOWN (\d+)%", line)
-                    if match:
-                        speed = int(match.group(1))
-                
-                # Calcola lunghezza movimento (approssimata)
-                if len(current_path["moves"]) > 0:
-                    prev = current_path["moves"][-1]
-                    dx = params.get("X", prev["x"]) - prev["x"]
-                    dy = params.get("Y", prev["y"]) - prev["y"]
-                    length = (dx**2 + dy**2)**0.5
-                else:
-                    length = 0
-                
-                current_path["moves"].append({
-                    "x": params.get("X", 0),
-                    "y": params.get("Y", 0),
-                    "phase": phase,
-                    "speed": speed,
-                    "length": length
-                })
 
 
 if __name__ == "__main__":
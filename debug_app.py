@@ -9,14 +9,30 @@ Esegui con: streamlit run debug_app.py
 import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
+import mmap
+import re
+import shutil
 import tempfile
 import os
+from array import array
 from pathlib import Path
 
 from src import GCodeProcessor, CurveType
 from src.processor import ProcessorConfig
-from src.gcode_parser import GCodeParser
-from src.smoothing import apply_curve
+from src.gcode_parser import GCodeParser, IO_BUFFER_SIZE
+from src.smoothing import apply_curve_array
+
+# Pattern precompilati per il parsing delle linee
+E_PATTERN = re.compile(rb"E(-?\d*\.?\d+)")
+
+# Tipo di linea in base al comando (primo token della linea)
+LINE_KINDS = {
+    b"G1": "move",
+    b"G0": "move",
+    b"G92": "reset",
+    b"M83": "relative_e",
+    b"M82": "absolute_e",
+}
 
 
 st.set_page_config(
@@ -28,145 +44,126 @@ st.set_page_config(
 st.title("🔧 FGF G-code Post Processor - Debug")
 
 
-def parse_gcode_for_visualization(filepath: str) -> dict:
-    """Parsa G-code ed estrae dati per visualizzazione."""
-    points = []
+def _scan_points(lines) -> dict:
+    """
+    Estrae i punti di visualizzazione da un iterabile di linee G-code (bytes).
+    
+    Returns:
+        Dizionario di array NumPy paralleli: "x", "y", "z", "f", "extrusion"
+    """
+    xs, ys, zs, fs = array("d"), array("d"), array("d"), array("d")
+    extrusion = array("b")
     current_pos = {"X": 0, "Y": 0, "Z": 0, "E": 0, "F": 1000}
     relative_e = False
     
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
+    for line in lines:
+        # I commenti sono le linee più frequenti dopo i G1: scartali subito
+        if line.startswith(b";"):
+            continue
+        
+        # Il commento non contiene parametri: scarta tutto dopo ';'.
+        # I token G-code sono separati da spazi (anche tab, newline finale)
+        line = line.partition(b";")[0]
+        tokens = line.split()
+        if not tokens:
+            continue
+        
+        # Dispatch sul comando: le linee non rilevanti (M-code, ecc.)
+        # vengono scartate con un solo lookup
+        kind = LINE_KINDS.get(tokens[0])
+        if kind is None:
+            continue
+        
+        if kind == "relative_e":
+            relative_e = True
+        elif kind == "absolute_e":
+            relative_e = False
+        elif kind == "reset":
+            # Reset E
+            for match in E_PATTERN.finditer(line):
+                current_pos["E"] = float(match.group(1))
+        elif kind == "move":
+            # Estrai parametri
+            params = {}
+            # Parametri: basta la prima lettera di ogni token
+            for token in tokens[1:]:
+                key = token[:1]
+                if key in b"XYZEF":
+                    try:
+                        params[key] = float(token[1:])
+                    except ValueError:
+                        pass
             
-            if line.startswith("M83"):
-                relative_e = True
-            elif line.startswith("M82"):
-                relative_e = False
-            elif line.startswith("G92"):
-                # Reset E
-                import re
-                for match in re.finditer(r"E(-?\.?\d+\.?\d*)", line):
-                    current_pos["E"] = float(match.group(1))
-            elif line.startswith("G1") or line.startswith("G0"):
-                # Estrai parametri
-                params = {}
-                import re
-                for match in re.finditer(r"([XYZEF])(-?\.?\d+\.?\d*)", line):
-                    params[match.group(1)] = float(match.group(2))
-                
-                # Determina se è estrusione PRIMA di aggiornare posizione
-                is_extrusion = False
-                if "E" in params:
-                    e_val = params["E"]
-                    if relative_e:
-                        # Estrusione relativa: positivo = estrude, negativo = retract
-                        is_extrusion = e_val > 0
-                        current_pos["E"] += e_val
-                    else:
-                        # Estrusione assoluta: confronta con valore precedente
-                        is_extrusion = e_val > current_pos["E"]
-                        current_pos["E"] = e_val
-                
-                # Aggiorna posizione
-                has_xy_move = False
-                if "X" in params:
-                    current_pos["X"] = params["X"]
-                    has_xy_move = True
-                if "Y" in params:
-                    current_pos["Y"] = params["Y"]
-                    has_xy_move = True
-                if "Z" in params:
-                    current_pos["Z"] = params["Z"]
-                if "F" in params:
-                    current_pos["F"] = params["F"]
-                
-                # Aggiungi punto solo se c'è movimento XY
-                if has_xy_move:
-                    points.append({
-                        "x": current_pos["X"],
-                        "y": current_pos["Y"],
-                        "z": current_pos["Z"],
-                        "f": current_pos["F"],
-                        "extrusion": is_extrusion
-                    })
+            # Determina se è estrusione PRIMA di aggiornare posizione
+            is_extrusion = False
+            if b"E" in params:
+                e_val = params[b"E"]
+                if relative_e:
+                    # Estrusione relativa: positivo = estrude, negativo = retract
+                    is_extrusion = e_val > 0
+                    current_pos["E"] += e_val
+                else:
+                    # Estrusione assoluta: confronta con valore precedente
+                    is_extrusion = e_val > current_pos["E"]
+                    current_pos["E"] = e_val
+            
+            # Aggiorna posizione
+            has_xy_move = False
+            if b"X" in params:
+                current_pos["X"] = params[b"X"]
+                has_xy_move = True
+            if b"Y" in params:
+                current_pos["Y"] = params[b"Y"]
+                has_xy_move = True
+            if b"Z" in params:
+                current_pos["Z"] = params[b"Z"]
+            if b"F" in params:
+                current_pos["F"] = params[b"F"]
+            
+            # Aggiungi punto solo se c'è movimento XY
+            if has_xy_move:
+                xs.append(current_pos["X"])
+                ys.append(current_pos["Y"])
+                zs.append(current_pos["Z"])
+                fs.append(current_pos["F"])
+                extrusion.append(is_extrusion)
     
-    return points
+    # Viste NumPy senza copia sulle colonne tipizzate
+    return {
+        "x": np.frombuffer(xs, dtype=np.float64),
+        "y": np.frombuffer(ys, dtype=np.float64),
+        "z": np.frombuffer(zs, dtype=np.float64),
+        "f": np.frombuffer(fs, dtype=np.float64),
+        "extrusion": np.frombuffer(extrusion, dtype=bool),
+    }
 
 
-def create_3d_plot(points: list, color_by_feedrate: bool = True, 
-                   extrusion_only: bool = True, z_range: tuple = None) -> go.Figure:
-    """Crea plot 3D del G-code colorato per feedrate."""
-    
-    # Filtra punti
-    if extrusion_only:
-        filtered = [p for p in points if p["extrusion"]]
-    else:
-        filtered = points
-    
-    if z_range:
-        filtered = [p for p in filtered if z_range[0] <= p["z"] <= z_range[1]]
-    
-    if not filtered:
-        return go.Figure()
-    
-    x = [p["x"] for p in filtered]
-    y = [p["y"] for p in filtered]
-    z = [p["z"] for p in filtered]
-    f = [p["f"] for p in filtered]
-    
-    # Normalizza feedrate per colori
-    f_min, f_max = min(f), max(f)
-    if f_max > f_min:
-        f_normalized = [(v - f_min) / (f_max - f_min) for v in f]
-    else:
-        f_normalized = [0.5] * len(f)
-    
-    fig = go.Figure()
-    
-    if color_by_feedrate:
-        fig.add_trace(go.Scatter3d(
-            x=x, y=y, z=z,
-            mode="lines",
-            line=dict(
-                color=f,
-                colorscale="Turbo",
-                width=2,
-                colorbar=dict(
-                    title="Feedrate (mm/min)",
-                    thickness=20
-                )
-            ),
-            hovertemplate="X: %{x:.2f}<br>Y: %{y:.2f}<br>Z: %{z:.2f}<br>F: %{marker.color:.0f}<extra></extra>"
-        ))
-    else:
-        fig.add_trace(go.Scatter3d(
-            x=x, y=y, z=z,
-            mode="lines",
-            line=dict(color="blue", width=2)
-        ))
-    
-    fig.update_layout(
-        scene=dict(
-            xaxis_title="X (mm)",
-            yaxis_title="Y (mm)",
-            zaxis_title="Z (mm)",
-            aspectmode="data"
-        ),
-        margin=dict(l=0, r=0, t=30, b=0),
-        height=600
-    )
+def parse_gcode_for_visualization(filepath: str) -> dict:
+    """Parsa G-code ed estrae dati per visualizzazione."""
+    # mmap non può mappare un file vuoto
+    if os.path.getsize(filepath) == 0:
+        return _scan_points([])
     
-    return fig
+    # Mappa il file in memoria e scandisce i byte senza decodifica
+    with open(filepath, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _scan_points(iter(mm.readline, b""))
 
 
+@st.cache_data(show_spinner=False)
 def plot_curve_comparison():
-    """Mostra confronto delle curve di smoothing."""
+    """
+    Mostra confronto delle curve di smoothing.
+    
+    Ogni curva è valutata in forma vettoriale sull'intero array di progress;
+    la figura non dipende dai parametri e viene costruita una sola volta.
+    """
     progress = np.linspace(0, 1, 100)
     
     fig = go.Figure()
     
     for curve_type in CurveType:
-        values = [apply_curve(p, curve_type) for p in progress]
+        values = apply_curve_array(progress, curve_type)
         fig.add_trace(go.Scatter(
             x=progress, y=values,
             mode="lines",
@@ -209,7 +206,8 @@ uploaded_file = st.file_uploader("Carica file G-code", type=["gcode", "gco", "nc
 if uploaded_file:
     # Salva file temporaneo
     with tempfile.NamedTemporaryFile(delete=False, suffix=".gcode") as tmp:
-        tmp.write(uploaded_file.getvalue())
+        uploaded_file.seek(0)
+        shutil.copyfileobj(uploaded_file, tmp, length=IO_BUFFER_SIZE)
         input_path = tmp.name
     
     st.success(f"✅ File caricato: {uploaded_file.name}")
@@ -226,13 +224,12 @@ if uploaded_file:
             segment_resolution=resolution
         )
         
-        # File output temporaneo
-        output_path = input_path.replace(".gcode", "_processed.gcode")
-        
-        # Processa
+        # Processa: l'output resta in memoria, nessun file temporaneo
         with st.spinner("🔄 Processing in corso..."):
             processor = GCodeProcessor(config)
-            stats = processor.process_file(input_path, output_path)
+            stats, output_content = processor.process_file(
+                input_path, None, return_content=True
+            )
         
         st.success("✅ Processing completato!")
         
@@ -250,10 +247,7 @@ if uploaded_file:
         
         st.metric("Lunghezza totale processata", f"{stats.total_path_length:,.2f} mm")
         
-        # Download
-        with open(output_path, "r") as f:
-            output_content = f.read()
-        
+        # Download (bytes già in memoria, nessuna rilettura da disco)
         st.download_button(
             label="📥 Download G-code processato",
             data=output_content,
@@ -265,7 +259,6 @@ if uploaded_file:
         
         # Cleanup
         try:
-            os.unlink(output_path)
             os.unlink(input_path)
         except:
             pass
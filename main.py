@@ -6,6 +6,7 @@ Utilizzo:
 """
 
 import argparse
+import gc
 import sys
 from pathlib import Path
 
@@ -24,6 +25,19 @@ def parse_curve_type(value: str) -> CurveType:
         )
 
 
+def parse_workers(value: str) -> int:
+    """Converte stringa in numero di processi (almeno 1)."""
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise argparse.ArgumentTypeError(
+            f"Numero di processi non valido: '{value}' (minimo 1)"
+        )
+    return workers
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="FGF G-code Post Processor - Pressure Smoothing per stampanti a pellet",
@@ -105,6 +119,13 @@ Curve disponibili:
         help="Risoluzione segmentazione nelle rampe in mm (default: 0.5)"
     )
     
+    parser.add_argument(
+        "--workers",
+        type=parse_workers,
+        default=1,
+        help="Processi per lo smoothing dei percorsi (default: 1)"
+    )
+    
     args = parser.parse_args()
     
     # Verifica file input
@@ -121,7 +142,8 @@ Curve disponibili:
         ramp_down_curve=args.curve_down,
         min_path_length=args.min_length,
         min_speed_ratio=args.min_speed,
-        segment_resolution=args.resolution
+        segment_resolution=args.resolution,
+        workers=args.workers
     )
     
     # Processa
@@ -134,10 +156,22 @@ Curve disponibili:
     print(f"  Min length: {config.min_path_length}mm")
     print(f"  Min speed:  {config.min_speed_ratio*100:.0f}%")
     print(f"  Resolution: {config.segment_resolution}mm")
+    if config.workers > 1:
+        print(f"  Workers:    {config.workers}")
     print()
     
-    processor = GCodeProcessor(config)
-    stats = processor.process_file(str(input_path), args.output)
+    # Il parsing alloca milioni di oggetti di vita breve e senza cicli:
+    # il garbage collector ciclico li scansionerebbe senza liberare nulla
+    # (la memoria viene già rilasciata dal reference counting). Solo nella
+    # CLI, dove il processo esegue un unico file
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        processor = GCodeProcessor(config)
+        stats = processor.process_file(str(input_path), args.output)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
     
     print("\n" + "=" * 60)
     print("Statistiche:")
@@ -4,8 +4,25 @@ FGF G-code Post Processor
 Post-processing per stampanti 3D a pellet (FGF - Fused Granulate Fabrication)
 """
 
-from .processor import GCodeProcessor
-from .smoothing import CurveType
-
 __version__ = "1.0.0"
 __all__ = ["GCodeProcessor", "CurveType"]
+
+
+def __getattr__(name: str):
+    """
+    Import differito dei simboli pubblici (PEP 562).
+    
+    I moduli del pacchetto (e NumPy) vengono caricati solo al primo accesso,
+    non all'import di `src`.
+    """
+    if name == "GCodeProcessor":
+        from .processor import GCodeProcessor
+        return GCodeProcessor
+    if name == "CurveType":
+        from .smoothing import CurveType
+        return CurveType
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -4,12 +4,66 @@ Parser G-code robusto
 Gestisce lettura, parsing e scrittura di comandi G-code.
 """
 
+import os
 import re
+from array import array
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Tuple
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, List, Tuple, Union
 
+import numpy as np
 
-@dataclass
+# Buffer di I/O per letture/scritture sequenziali di interi file G-code
+# (il default di 8 KB moltiplica le syscall su file da centinaia di MB)
+IO_BUFFER_SIZE = 1 << 20
+
+# Limiti del buffer di lettura adattivo: file piccoli non allocano 1 MB,
+# file da centinaia di MB vengono letti con poche syscall
+MIN_READ_BUFFER_SIZE = 64 << 10
+MAX_READ_BUFFER_SIZE = 16 << 20
+
+# Codici dei comandi rilevanti per l'analisi (layout a colonne)
+CMD_OTHER = 0
+CMD_G0 = 1
+CMD_G1 = 2
+CMD_G92 = 3
+CMD_M82 = 4
+CMD_M83 = 5
+
+COMMAND_CODES = {
+    "G0": CMD_G0,
+    "G1": CMD_G1,
+    "G92": CMD_G92,
+    "M82": CMD_M82,
+    "M83": CMD_M83,
+}
+
+# Bit di presenza dei parametri X, Y, Z, E, F
+HAS_X = 1
+HAS_Y = 2
+HAS_Z = 4
+HAS_E = 8
+HAS_F = 16
+
+
+def _param_mask(code: int, params: Dict[str, float]) -> int:
+    """Bit HAS_* dei parametri presenti (0 per i comandi CMD_OTHER)."""
+    mask = 0
+    if code != CMD_OTHER and params:
+        if "X" in params:
+            mask |= HAS_X
+        if "Y" in params:
+            mask |= HAS_Y
+        if "Z" in params:
+            mask |= HAS_Z
+        if "E" in params:
+            mask |= HAS_E
+        if "F" in params:
+            mask |= HAS_F
+    return mask
+
+
+@dataclass(slots=True)
 class GCodeCommand:
     """Rappresenta un singolo comando G-code parsato."""
     line_number: int
@@ -17,30 +71,45 @@ class GCodeCommand:
     command: Optional[str] = None  # es. "G1", "M104", None per commenti
     params: Dict[str, float] = field(default_factory=dict)
     comment: Optional[str] = None
+    # Codice intero del comando (CMD_*), assegnato dal parser: i controlli
+    # sul tipo di comando confrontano interi invece di stringhe
+    code: Optional[int] = None
+    # Bit HAS_* dei parametri X, Y, Z, E, F presenti (solo comandi CMD_*
+    # diversi da CMD_OTHER), assegnati dal parser
+    param_mask: Optional[int] = None
     _modified: bool = field(default=False, repr=False)
+    # Modifiche applicate in scrittura senza copiare params
+    feedrate_override: Optional[float] = None
+    comment_append: Optional[str] = None
+    
+    def __post_init__(self) -> None:
+        # Comandi costruiti senza il parser: codice e bit derivati da
+        # command e params
+        if self.code is None:
+            self.code = COMMAND_CODES.get(self.command, CMD_OTHER)
+        if self.param_mask is None:
+            self.param_mask = _param_mask(self.code, self.params)
     
     @property
     def is_movement(self) -> bool:
         """Verifica se è un comando di movimento (G0 o G1)."""
-        return self.command in ("G0", "G1")
+        return self.code == CMD_G0 or self.code == CMD_G1
     
     @property
     def is_extrusion_move(self) -> bool:
         """Verifica se è un movimento con estrusione positiva."""
-        if self.command != "G1":
+        if self.code != CMD_G1:
             return False
-        has_xy = "X" in self.params or "Y" in self.params
-        has_e = "E" in self.params
-        return has_xy and has_e
+        mask = self.param_mask
+        return bool(mask & (HAS_X | HAS_Y)) and bool(mask & HAS_E)
     
     @property
     def is_travel_move(self) -> bool:
         """Verifica se è un movimento senza estrusione (travel)."""
-        if self.command not in ("G0", "G1"):
+        if self.code != CMD_G0 and self.code != CMD_G1:
             return False
-        has_xy = "X" in self.params or "Y" in self.params
-        has_e = "E" in self.params
-        return has_xy and not has_e
+        mask = self.param_mask
+        return bool(mask & (HAS_X | HAS_Y)) and not mask & HAS_E
     
     def to_gcode(self) -> str:
         """Converte il comando in stringa G-code."""
@@ -54,37 +123,162 @@ class GCodeCommand:
                 return f";{self.comment}"
             return ""
         
-        parts = [self.command]
-        
-        # Ordine standard dei parametri
-        param_order = ["X", "Y", "Z", "E", "F"]
-        for param in param_order:
-            if param in self.params:
-                value = self.params[param]
-                if param == "E":
-                    parts.append(f"{param}{value:.5f}")
-                elif param == "F":
-                    parts.append(f"{param}{value:.1f}")
-                else:
-                    parts.append(f"{param}{value:.3f}")
+        # Template specializzato per la forma del comando (es. G1 X Y E F)
+        params = self.params
+        override = self.feedrate_override
+        template, order = _command_template(
+            self.command, tuple(params), override is not None
+        )
+        if override is None:
+            result = template.format(*[params[param] for param in order])
+        else:
+            result = template.format(*[
+                override if param == "F" else params[param] for param in order
+            ])
         
-        # Altri parametri non standard
-        for param, value in self.params.items():
-            if param not in param_order:
-                parts.append(f"{param}{value}")
+        comment = self.comment
+        if self.comment_append is not None:
+            comment = f"{comment} ; {self.comment_append}" if comment else self.comment_append
+        if comment:
+            result += f" ;{comment}"
         
-        result = " ".join(parts)
+        return result
+
+
+# Ordine standard dei parametri in output e relativa formattazione
+PARAM_ORDER = ("X", "Y", "Z", "E", "F")
+PARAM_FORMATS = {"X": ".3f", "Y": ".3f", "Z": ".3f", "E": ".5f", "F": ".1f"}
+
+
+@lru_cache(maxsize=1024)
+def _command_template(
+    command: str,
+    param_keys: Tuple[str, ...],
+    feedrate_override: bool
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Template di formattazione per una forma di comando.
+    
+    Costruito una sola volta per combinazione di comando e parametri
+    presenti: parametri standard nell'ordine X Y Z E F, poi gli altri
+    nell'ordine originale.
+    
+    Returns:
+        Tuple (template per str.format, parametri nell'ordine dei campi)
+    """
+    parts = [command.replace("{", "{{").replace("}", "}}")]
+    order: List[str] = []
+    
+    for param in PARAM_ORDER:
+        if param in param_keys or (param == "F" and feedrate_override):
+            parts.append(f"{param}{{{len(order)}:{PARAM_FORMATS[param]}}}")
+            order.append(param)
+    
+    # Altri parametri non standard
+    for param in param_keys:
+        if param not in PARAM_FORMATS:
+            parts.append(f"{param}{{{len(order)}}}")
+            order.append(param)
+    
+    return " ".join(parts), tuple(order)
+
+
+# Linea di output: comando parsato oppure linea G-code già formattata
+GCodeLine = Union[GCodeCommand, str]
+
+
+@dataclass(slots=True)
+class ParsedProgram:
+    """
+    Programma G-code parsato con layout a colonne (struct of arrays).
+    
+    Le colonne NumPy sono allineate a `commands` e contengono solo ciò che
+    serve all'analisi dei percorsi: codice comando, bit dei parametri
+    presenti e valori di X, Y, Z, E, F (0.0 se assenti).
+    """
+    commands: List[GCodeCommand]
+    codes: np.ndarray  # int8, CMD_*
+    masks: np.ndarray  # uint8, HAS_*
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    e: np.ndarray
+    f: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.commands)
+    
+    @classmethod
+    def from_commands(cls, commands: List[GCodeCommand]) -> "ParsedProgram":
+        """Costruisce le colonne da una lista di comandi parsati."""
+        codes, masks = array("b"), array("B")
+        xs, ys, zs, es, fs = array("d"), array("d"), array("d"), array("d"), array("d")
         
-        if self.comment:
-            result += f" ;{self.comment}"
+        for cmd in commands:
+            code = cmd.code
+            mask = cmd.param_mask
+            params = cmd.params
+            codes.append(code)
+            masks.append(mask)
+            if mask:
+                xs.append(params.get("X", 0.0))
+                ys.append(params.get("Y", 0.0))
+                zs.append(params.get("Z", 0.0))
+                es.append(params.get("E", 0.0))
+                fs.append(params.get("F", 0.0))
+            else:
+                xs.append(0.0)
+                ys.append(0.0)
+                zs.append(0.0)
+                es.append(0.0)
+                fs.append(0.0)
         
-        return result
+        return cls(
+            commands=commands,
+            codes=np.frombuffer(codes, dtype=np.int8),
+            masks=np.frombuffer(masks, dtype=np.uint8),
+            x=np.frombuffer(xs, dtype=np.float64),
+            y=np.frombuffer(ys, dtype=np.float64),
+            z=np.frombuffer(zs, dtype=np.float64),
+            e=np.frombuffer(es, dtype=np.float64),
+            f=np.frombuffer(fs, dtype=np.float64),
+        )
+
+
+def _read_buffer_size(filepath: str) -> int:
+    """
+    Dimensione del buffer di lettura adatta alla dimensione del file.
+    
+    Circa 1/64 del file, arrotondata a potenza di 2 e limitata tra
+    MIN_READ_BUFFER_SIZE e MAX_READ_BUFFER_SIZE.
+    """
+    size = os.path.getsize(filepath) // 64
+    buffer_size = MIN_READ_BUFFER_SIZE
+    while buffer_size < size and buffer_size < MAX_READ_BUFFER_SIZE:
+        buffer_size <<= 1
+    return buffer_size
+
+
+def _open_sequential(filepath: str, buffer_size: int):
+    """
+    Apre un file G-code in lettura sequenziale.
+    
+    Dove disponibile (Linux) chiede al kernel un readahead aggressivo,
+    che riduce l'attesa sulle letture a cache fredda.
+    """
+    f = open(filepath, "r", encoding="utf-8", buffering=buffer_size)
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+    return f
 
 
 class GCodeParser:
     """Parser per file G-code."""
     
-    # Pattern per parsing parametri G-code
+    # Pattern per parsing parametri G-code (fallback dello scanner a token)
     # Gestisce: X100, X-100, X100.5, X.5, X-.5
     PARAM_PATTERN = re.compile(r"([A-Z])(-?\.?\d+\.?\d*)")
     
@@ -104,23 +298,29 @@ class GCodeParser:
         
         # Linea vuota
         if not line:
-            return GCodeCommand(line_number=line_number, raw_line=raw_line)
+            return GCodeCommand(
+                line_number=line_number,
+                raw_line=raw_line,
+                code=CMD_OTHER,
+                param_mask=0
+            )
         
         # Separa commento
-        comment = None
-        if ";" in line:
-            code_part, comment = line.split(";", 1)
+        code_part, separator, comment = line.partition(";")
+        if separator:
             code_part = code_part.strip()
             comment = comment.strip()
         else:
-            code_part = line
+            comment = None
         
         # Solo commento
         if not code_part:
             return GCodeCommand(
                 line_number=line_number,
                 raw_line=raw_line,
-                comment=comment
+                comment=comment,
+                code=CMD_OTHER,
+                param_mask=0
             )
         
         # Estrai comando (es. G1, M104)
@@ -129,26 +329,42 @@ class GCodeParser:
             return GCodeCommand(
                 line_number=line_number,
                 raw_line=raw_line,
-                comment=comment
+                comment=comment,
+                code=CMD_OTHER,
+                param_mask=0
             )
         
         command = parts[0].upper()
         
         # Parsa parametri
         params = {}
-        param_str = code_part[len(parts[0]):].strip()
+        # Scanner per token: il caso comune (lettera + numero semplice) è
+        # riconosciuto con metodi str nativi, senza regex
+        for token in parts[1:]:
+            letter = token[0]
+            value = token[1:]
+            # Segno opzionale, poi cifre con al più un punto decimale
+            digits = value[1:] if value[:1] == "-" else value
+            if "A" <= letter <= "Z" and digits.replace(".", "", 1).isdecimal():
+                params[letter] = float(value)
+                continue
+            
+            # Token irregolari (es. "X1Y2", "x5", "X.1.2"): fallback sul
+            # pattern, così la semantica resta identica
+            for match in self.PARAM_PATTERN.finditer(token):
+                params[match.group(1)] = float(match.group(2))
         
-        for match in self.PARAM_PATTERN.finditer(param_str):
-            param_name = match.group(1)
-            param_value = float(match.group(2))
-            params[param_name] = param_value
+        # Bit dei parametri per i soli comandi rilevanti per l'analisi
+        code = COMMAND_CODES.get(command, CMD_OTHER)
         
         return GCodeCommand(
             line_number=line_number,
             raw_line=raw_line,
             command=command,
             params=params,
-            comment=comment
+            comment=comment,
+            code=code,
+            param_mask=_param_mask(code, params)
         )
     
     def parse_file(self, filepath: str) -> List[GCodeCommand]:
@@ -161,22 +377,62 @@ class GCodeParser:
         Returns:
             Lista di GCodeCommand
         """
-        commands = []
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line_num, line in enumerate(f, start=1):
-                cmd = self.parse_line(line, line_num)
-                commands.append(cmd)
-        return commands
+        # Lettura e divisione in linee in blocco (newline universali come
+        # nell'iterazione riga per riga), poi un'unica passata di parsing
+        with _open_sequential(filepath, _read_buffer_size(filepath)) as f:
+            lines = f.read().split("\n")
+        
+        # Il newline finale non apre una nuova linea
+        if lines[-1] == "":
+            lines.pop()
+        
+        parse_line = self.parse_line
+        return [
+            parse_line(line, line_num)
+            for line_num, line in enumerate(lines, start=1)
+        ]
+    
+    def parse_stream(self, filepath: str) -> Iterator[ParsedProgram]:
+        """
+        Parsa un file G-code a blocchi, senza caricarlo tutto in memoria.
+        
+        Ogni blocco contiene le linee lette in un buffer di lettura (da 64 KB
+        a 16 MB secondo la dimensione del file); i numeri di linea
+        proseguono da un blocco all'altro.
+        
+        Args:
+            filepath: Percorso del file
+            
+        Yields:
+            ParsedProgram di ogni blocco, nell'ordine del file
+        """
+        parse_line = self.parse_line
+        line_num = 0
+        buffer_size = _read_buffer_size(filepath)
+        with _open_sequential(filepath, buffer_size) as f:
+            while True:
+                lines = f.readlines(buffer_size)
+                if not lines:
+                    break
+                commands = [
+                    parse_line(line, num)
+                    for num, line in enumerate(lines, start=line_num + 1)
+                ]
+                line_num += len(lines)
+                yield ParsedProgram.from_commands(commands)
 
 
-def write_gcode(commands: List[GCodeCommand], filepath: str) -> None:
+def write_gcode(commands: List[GCodeLine], filepath: str) -> None:
     """
     Scrive una lista di comandi in un file G-code.
     
     Args:
-        commands: Lista di GCodeCommand da scrivere
+        commands: Lista di GCodeCommand (o linee già formattate) da scrivere
         filepath: Percorso del file di output
     """
-    with open(filepath, "w", encoding="utf-8") as f:
+    with open(filepath, "w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as f:
         for cmd in commands:
-            f.write(cmd.to_gcode() + "\n")
+            if not isinstance(cmd, str):
+                cmd = cmd.to_gcode()
+            f.write(cmd + "\n")
+
@@ -4,34 +4,40 @@ Analizzatore di percorsi di estrusione
 Identifica percorsi continui di estrusione nel G-code.
 """
 
-import math
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
-from .gcode_parser import GCodeCommand
+import numpy as np
 
-
-@dataclass
-class Point:
-    """Punto 3D con estrusione."""
-    x: float
-    y: float
-    z: float
-    e: float
-    
-    def distance_xy(self, other: "Point") -> float:
-        """Calcola distanza 2D (XY) da un altro punto."""
-        dx = other.x - self.x
-        dy = other.y - self.y
-        return math.sqrt(dx * dx + dy * dy)
+from .gcode_parser import (
+    GCodeCommand,
+    ParsedProgram,
+    CMD_G0,
+    CMD_G1,
+    CMD_G92,
+    CMD_M82,
+    CMD_M83,
+    HAS_X,
+    HAS_Y,
+    HAS_Z,
+    HAS_E,
+    HAS_F
+)
 
 
-@dataclass 
+@dataclass(slots=True)
 class ExtrusionMove:
     """Singolo movimento di estrusione."""
     command: GCodeCommand
-    start_point: Point
-    end_point: Point
+    # Posizione di inizio (s*) e fine (e*) del movimento: X, Y, Z, E
+    sx: float
+    sy: float
+    sz: float
+    se: float
+    ex: float
+    ey: float
+    ez: float
+    ee: float
     length: float  # Lunghezza XY del movimento
     extrusion: float  # Quantità di materiale estruso (E delta)
     feedrate: float
@@ -41,23 +47,31 @@ class ExtrusionMove:
         return self.command.line_number
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtrusionPath:
     """Percorso continuo di estrusione (sequenza di movimenti)."""
     moves: List[ExtrusionMove] = field(default_factory=list)
     feature_type: str = "unknown"
     start_line: int = 0
     end_line: int = 0
+    # Totali mantenuti insieme ai movimenti (vedi extend_moves)
+    total_length: float = field(default=0.0, init=False)  # mm
+    total_extrusion: float = field(default=0.0, init=False)
     
-    @property
-    def total_length(self) -> float:
-        """Lunghezza totale del percorso in mm."""
-        return sum(m.length for m in self.moves)
+    def __post_init__(self) -> None:
+        self.total_length = sum(m.length for m in self.moves)
+        self.total_extrusion = sum(m.extrusion for m in self.moves)
     
-    @property
-    def total_extrusion(self) -> float:
-        """Estrusione totale del percorso."""
-        return sum(m.extrusion for m in self.moves)
+    def extend_moves(self, moves: List[ExtrusionMove]) -> None:
+        """Aggiunge movimenti in coda aggiornando i totali."""
+        total_length = self.total_length
+        total_extrusion = self.total_extrusion
+        for m in moves:
+            total_length += m.length
+            total_extrusion += m.extrusion
+        self.moves.extend(moves)
+        self.total_length = total_length
+        self.total_extrusion = total_extrusion
     
     @property
     def move_count(self) -> int:
@@ -69,9 +83,9 @@ class ExtrusionPath:
         return self.total_length >= min_length and self.move_count > 0
 
 
-@dataclass
+@dataclass(slots=True)
 class MachineState:
-    """Stato corrente della macchina durante il parsing."""
+    """Stato della macchina all'inizio (o alla fine) dell'analisi."""
     x: float = 0.0
     y: float = 0.0
     z: float = 0.0
@@ -79,44 +93,68 @@ class MachineState:
     f: float = 1200.0
     relative_extrusion: bool = False
     current_feature: str = "unknown"
+
+
+def _forward_fill(values: np.ndarray, is_set: np.ndarray, initial) -> np.ndarray:
+    """
+    Propaga in avanti l'ultimo valore impostato lungo le linee.
     
-    def get_position(self) -> Point:
-        """Restituisce la posizione corrente come Point."""
-        return Point(self.x, self.y, self.z, self.e)
-    
-    def update_from_command(self, cmd: GCodeCommand) -> None:
-        """Aggiorna lo stato in base a un comando G-code."""
-        if cmd.command == "G1" or cmd.command == "G0":
-            if "X" in cmd.params:
-                self.x = cmd.params["X"]
-            if "Y" in cmd.params:
-                self.y = cmd.params["Y"]
-            if "Z" in cmd.params:
-                self.z = cmd.params["Z"]
-            if "F" in cmd.params:
-                self.f = cmd.params["F"]
-            if "E" in cmd.params:
-                if self.relative_extrusion:
-                    self.e += cmd.params["E"]
-                else:
-                    self.e = cmd.params["E"]
-        
-        elif cmd.command == "G92":
-            # Reset assi
-            if "E" in cmd.params:
-                self.e = cmd.params["E"]
-            if "X" in cmd.params:
-                self.x = cmd.params["X"]
-            if "Y" in cmd.params:
-                self.y = cmd.params["Y"]
-            if "Z" in cmd.params:
-                self.z = cmd.params["Z"]
+    Args:
+        values: Valore di ogni linea (considerato solo dove is_set è True)
+        is_set: Linee che impostano il valore
+        initial: Valore in vigore prima della prima linea
         
-        elif cmd.command == "M82":
-            self.relative_extrusion = False
+    Returns:
+        Valore in vigore dopo ogni linea
+    """
+    source = np.where(is_set, np.arange(1, len(values) + 1), 0)
+    np.maximum.accumulate(source, out=source)
+    return np.concatenate(([initial], values))[source]
+
+
+def _shift(after: np.ndarray, initial) -> np.ndarray:
+    """Valori in vigore prima di ogni linea, dati quelli dopo ogni linea."""
+    return np.concatenate(([initial], after[:-1]))
+
+
+def _extrusion_state(
+    e: np.ndarray,
+    is_set: np.ndarray,
+    is_add: np.ndarray,
+    initial: float
+) -> np.ndarray:
+    """
+    Posizione E in vigore dopo ogni linea.
+    
+    Args:
+        e: Valore del parametro E di ogni linea
+        is_set: Linee che impostano E (G92, G0/G1 in modalità assoluta)
+        is_add: Linee che incrementano E (G0/G1 in modalità relativa)
+        initial: Posizione E prima della prima linea
         
-        elif cmd.command == "M83":
-            self.relative_extrusion = True
+    Returns:
+        Posizione E dopo ogni linea
+    """
+    if not is_add.any():
+        return _forward_fill(e, is_set, initial)
+    
+    # Sequenza delle sole variazioni di E, preceduta dal valore iniziale
+    changes = is_set | is_add
+    ops = np.flatnonzero(changes)
+    values = np.concatenate(([initial], e[ops]))
+    resets = np.concatenate(([True], is_set[ops]))
+    
+    # Somma cumulativa dentro ogni tratto tra due reset: np.cumsum somma in
+    # sequenza, con gli stessi arrotondamenti degli incrementi uno alla volta
+    starts = np.flatnonzero(resets)
+    ends = np.append(starts[1:], len(values))
+    accumulating = ends - starts > 1
+    for start, end in zip(starts[accumulating].tolist(), ends[accumulating].tolist()):
+        values[start:end] = np.cumsum(values[start:end])
+    
+    line_values = np.zeros(len(e))
+    line_values[ops] = values[1:]
+    return _forward_fill(line_values, changes, initial)
 
 
 class PathAnalyzer:
@@ -129,148 +167,262 @@ class PathAnalyzer:
         """Reset dello stato del parser."""
         self.state = MachineState()
     
-    def _is_extrusion_move(self, cmd: GCodeCommand) -> bool:
-        """Verifica se un comando è un movimento con estrusione positiva."""
-        if cmd.command != "G1":
-            return False
-        
-        has_xy = "X" in cmd.params or "Y" in cmd.params
-        has_e = "E" in cmd.params
-        
-        if not (has_xy and has_e):
-            return False
-        
-        e_value = cmd.params["E"]
-        
-        if self.state.relative_extrusion:
-            return e_value > 0
-        else:
-            return e_value > self.state.e
-    
-    def _create_extrusion_move(self, cmd: GCodeCommand) -> ExtrusionMove:
-        """Crea un ExtrusionMove da un comando G-code."""
-        start_point = self.state.get_position()
-        
-        # Calcola end point
-        end_x = cmd.params.get("X", self.state.x)
-        end_y = cmd.params.get("Y", self.state.y)
-        end_z = cmd.params.get("Z", self.state.z)
-        
-        e_param = cmd.params.get("E", self.state.e)
-        if self.state.relative_extrusion:
-            end_e = self.state.e + e_param
-            extrusion = e_param
-        else:
-            end_e = e_param
-            extrusion = e_param - self.state.e
-        
-        end_point = Point(end_x, end_y, end_z, end_e)
-        
-        # Calcola lunghezza XY
-        length = start_point.distance_xy(end_point)
-        
-        # Feedrate
-        feedrate = cmd.params.get("F", self.state.f)
-        
-        return ExtrusionMove(
-            command=cmd,
-            start_point=start_point,
-            end_point=end_point,
-            length=length,
-            extrusion=extrusion,
-            feedrate=feedrate
-        )
-    
     def _detect_feature_type(self, cmd: GCodeCommand) -> Optional[str]:
         """Rileva il tipo di feature dal commento del comando."""
-        if cmd.comment:
+        # Senza ':' non può esserci "TYPE:": evita upper() sulla gran parte
+        # dei commenti (es. ;WIPE_START, ;LAYER_CHANGE)
+        if cmd.comment and ":" in cmd.comment:
             comment_upper = cmd.comment.upper()
             if "TYPE:" in comment_upper:
                 # Formato: ;TYPE:WALL-OUTER
                 return cmd.comment.split(":")[-1].strip()
         return None
     
-    def analyze(self, commands: List[GCodeCommand]) -> List[ExtrusionPath]:
+    def analyze(
+        self,
+        commands: Union[List[GCodeCommand], ParsedProgram]
+    ) -> List[ExtrusionPath]:
         """
         Analizza i comandi e identifica i percorsi di estrusione.
         
         Args:
-            commands: Lista di comandi G-code parsati
+            commands: Lista di comandi G-code parsati (es. parse_file) oppure
+                programma già nel layout a colonne
             
         Returns:
             Lista di ExtrusionPath identificati
         """
+        if isinstance(commands, ParsedProgram):
+            program = commands
+        else:
+            program = ParsedProgram.from_commands(commands)
+        
         self.reset()
-        paths: List[ExtrusionPath] = []
-        current_path: Optional[ExtrusionPath] = None
+        paths, _, _ = self._analyze_block(program, None)
+        return paths
+    
+    def analyze_stream(
+        self,
+        programs: Iterable[ParsedProgram]
+    ) -> Iterator[Union[GCodeCommand, ExtrusionPath]]:
+        """
+        Analizza un programma a blocchi, emettendo i percorsi appena chiusi.
         
-        for cmd in commands:
-            # Rileva cambio feature type
-            feature = self._detect_feature_type(cmd)
-            if feature:
-                # Chiudi percorso corrente se presente
-                if current_path and current_path.moves:
-                    current_path.end_line = current_path.moves[-1].line_number
-                    paths.append(current_path)
-                    current_path = None
-                self.state.current_feature = feature
-            
-            # Chiudi percorso se incontriamo commenti di fine estrusione
-            if cmd.comment and any(marker in cmd.comment for marker in ["WIPE_START", "WIPE_END"]):
-                if current_path and current_path.moves:
-                    current_path.end_line = current_path.moves[-1].line_number
-                    paths.append(current_path)
-                    current_path = None
-                continue
+        Le linee che non sono movimenti di un percorso vengono emesse così
+        come sono. Un percorso viene emesso alla sua chiusura, seguito dalle
+        linee incontrate dopo il suo primo movimento: è l'ordine in cui
+        compaiono nell'output, con il percorso al posto del primo movimento.
+        
+        Args:
+            programs: Blocchi consecutivi del programma (es. parse_stream)
             
-            # Gestisci comandi che cambiano modalità
-            if cmd.command in ("M82", "M83", "G92"):
-                # Chiudi percorso corrente
-                if current_path and current_path.moves:
-                    current_path.end_line = current_path.moves[-1].line_number
-                    paths.append(current_path)
-                    current_path = None
-                self.state.update_from_command(cmd)
-                continue
+        Yields:
+            GCodeCommand da copiare in output oppure ExtrusionPath chiusi
+        """
+        self.reset()
+        current: Optional[ExtrusionPath] = None
+        held: List[GCodeCommand] = []
+        
+        for program in programs:
+            paths, line_path, closes = self._analyze_block(program, current)
             
-            # Verifica se è movimento di estrusione
-            if self._is_extrusion_move(cmd):
-                # Crea nuovo percorso se necessario
-                if current_path is None:
-                    current_path = ExtrusionPath(
-                        feature_type=self.state.current_feature,
-                        start_line=cmd.line_number
-                    )
-                
-                # Aggiungi movimento al percorso
-                move = self._create_extrusion_move(cmd)
-                current_path.moves.append(move)
+            for cmd, path_index, closing in zip(
+                program.commands, line_path.tolist(), closes.tolist()
+            ):
+                if closing and current is not None:
+                    yield current
+                    yield from held
+                    current = None
+                    held = []
                 
-                # Aggiorna stato
-                self.state.update_from_command(cmd)
+                if path_index >= 0:
+                    # Movimento di un percorso: sostituito dal percorso stesso
+                    current = paths[path_index]
+                elif current is not None:
+                    held.append(cmd)
+                else:
+                    yield cmd
+        
+        # Chiudi ultimo percorso
+        if current is not None:
+            yield current
+            yield from held
+    
+    def _analyze_block(
+        self,
+        program: ParsedProgram,
+        open_path: Optional[ExtrusionPath]
+    ) -> Tuple[List[ExtrusionPath], np.ndarray, np.ndarray]:
+        """
+        Analizza un blocco di linee a partire dallo stato corrente.
+        
+        Lo stato della macchina (posizione, feedrate, modalità di estrusione)
+        viene propagato su tutte le linee con operazioni vettoriali NumPy;
+        un percorso è una sequenza di movimenti di estrusione non interrotta
+        da travel, cambi di modalità, wipe o cambi di feature. A fine blocco
+        self.state contiene lo stato dopo l'ultima linea.
+        
+        Args:
+            program: Blocco di programma G-code parsato
+            open_path: Percorso ancora aperto alla fine del blocco precedente:
+                i movimenti prima della prima chiusura lo proseguono
             
-            elif cmd.command in ("G0", "G1"):
-                # Distingui tra travel move e feedrate-only command
-                has_movement = any(axis in cmd.params for axis in ["X", "Y", "Z"])
-                
-                if has_movement:
-                    # Movimento senza estrusione (travel) - chiude il percorso
-                    if current_path and current_path.moves:
-                        current_path.end_line = current_path.moves[-1].line_number
-                        paths.append(current_path)
-                        current_path = None
-                # else: comando solo feedrate (G1 F...) - non chiude percorso
-                # Questi comandi vengono usati per cambiare velocità all'interno di un percorso
-                
-                self.state.update_from_command(cmd)
+        Returns:
+            Tuple (percorsi, indice del percorso di ogni linea o -1,
+            linee che chiudono il percorso corrente)
+        """
+        state = self.state
+        commands = program.commands
+        codes, masks = program.codes, program.masks
+        
+        if not commands:
+            return [], np.zeros(0, dtype=np.int32), np.zeros(0, dtype=bool)
+        
+        # Marker nei commenti: cambi di feature e wipe
+        feature_lines: List[int] = []
+        features: List[str] = []
+        wipe_lines: List[int] = []
+        for i, cmd in enumerate(commands):
+            if cmd.comment:
+                feature = self._detect_feature_type(cmd)
+                if feature:
+                    feature_lines.append(i)
+                    features.append(feature)
+                if "WIPE_START" in cmd.comment or "WIPE_END" in cmd.comment:
+                    wipe_lines.append(i)
+        
+        # Le linee di wipe vengono saltate: non aggiornano lo stato
+        active = np.ones(len(commands), dtype=bool)
+        active[wipe_lines] = False
+        
+        is_g1 = (codes == CMD_G1) & active
+        is_motion = ((codes == CMD_G0) & active) | is_g1
+        is_g92 = (codes == CMD_G92) & active
+        is_mode = ((codes == CMD_M82) | (codes == CMD_M83)) & active
+        has_x = (masks & HAS_X) != 0
+        has_y = (masks & HAS_Y) != 0
+        has_z = (masks & HAS_Z) != 0
+        has_e = (masks & HAS_E) != 0
+        has_f = (masks & HAS_F) != 0
+        
+        # Modalità di estrusione in vigore su ogni linea
+        relative_after = _forward_fill(codes == CMD_M83, is_mode, state.relative_extrusion)
+        relative = _shift(relative_after, state.relative_extrusion)
+        
+        # Stato dopo ogni linea (G92 reimposta anche gli assi)
+        sets_axis = is_motion | is_g92
+        x_after = _forward_fill(program.x, sets_axis & has_x, state.x)
+        y_after = _forward_fill(program.y, sets_axis & has_y, state.y)
+        z_after = _forward_fill(program.z, sets_axis & has_z, state.z)
+        f_after = _forward_fill(program.f, is_motion & has_f, state.f)
+        e_after = _extrusion_state(
+            program.e,
+            (is_g92 | (is_motion & ~relative)) & has_e,
+            is_motion & relative & has_e,
+            state.e
+        )
+        e_before = _shift(e_after, state.e)
+        
+        # Movimenti G1 con XY ed estrusione positiva
+        is_extrusion = is_g1 & (has_x | has_y) & has_e & np.where(
+            relative, program.e > 0, program.e > e_before
+        )
+        
+        # Eventi che chiudono il percorso corrente: travel (movimento senza
+        # estrusione; i comandi solo F/E non chiudono), cambi di modalità,
+        # wipe e cambi di feature
+        is_travel = is_motion & (has_x | has_y | has_z) & ~is_extrusion
+        closes = is_travel | is_g92 | is_mode
+        closes[feature_lines] = True
+        closes[wipe_lines] = True
+        segment = np.cumsum(closes)
+        
+        # Feature in vigore su ogni linea (-1 = quella iniziale)
+        feature_marks = np.zeros(len(commands), dtype=bool)
+        feature_marks[feature_lines] = True
+        line_feature = np.zeros(len(commands), dtype=np.int64)
+        line_feature[feature_lines] = np.arange(len(features))
+        line_feature = _forward_fill(line_feature, feature_marks, -1)
+        
+        # Colonne dei soli movimenti di estrusione: stato prima e dopo
+        moves_at = np.flatnonzero(is_extrusion)
+        start_x = _shift(x_after, state.x)[moves_at]
+        start_y = _shift(y_after, state.y)[moves_at]
+        end_x = x_after[moves_at]
+        end_y = y_after[moves_at]
+        
+        # Lunghezze XY di tutti i movimenti in un'unica operazione vettoriale
+        # (sqrt(dx*dx + dy*dy) come math.sqrt, quindi stessi risultati;
+        # np.hypot arrotonda diversamente)
+        dx = end_x - start_x
+        dy = end_y - start_y
+        lengths = np.sqrt(dx * dx + dy * dy)
+        extrusions = np.where(
+            relative[moves_at],
+            program.e[moves_at],
+            program.e[moves_at] - e_before[moves_at]
+        )
+        
+        columns = zip(
+            moves_at.tolist(),
+            start_x.tolist(),
+            start_y.tolist(),
+            _shift(z_after, state.z)[moves_at].tolist(),
+            e_before[moves_at].tolist(),
+            end_x.tolist(),
+            end_y.tolist(),
+            z_after[moves_at].tolist(),
+            e_after[moves_at].tolist(),
+            lengths.tolist(),
+            extrusions.tolist(),
+            f_after[moves_at].tolist()
+        )
+        
+        moves: List[ExtrusionMove] = []
+        for i, sx, sy, sz, se, ex, ey, ez, ee, length, extrusion, feedrate in columns:
+            moves.append(ExtrusionMove(
+                commands[i], sx, sy, sz, se, ex, ey, ez, ee,
+                length, extrusion, feedrate
+            ))
+        
+        # Un nuovo percorso inizia a ogni movimento preceduto da una chiusura
+        move_segments = segment[moves_at]
+        path_starts = np.flatnonzero(np.diff(move_segments, prepend=-1)).tolist()
+        path_ends = path_starts[1:] + [len(moves)]
+        path_features = line_feature[moves_at[path_starts]].tolist()
+        
+        paths: List[ExtrusionPath] = []
+        for start, end, feature_index in zip(path_starts, path_ends, path_features):
+            path_moves = moves[start:end]
             
-            else:
-                # Altri comandi (M codes, ecc) - aggiorna stato se necessario
-                self.state.update_from_command(cmd)
+            # Movimenti prima di ogni chiusura: proseguono il percorso aperto
+            if open_path is not None and start == 0 and move_segments[0] == 0:
+                open_path.extend_moves(path_moves)
+                open_path.end_line = path_moves[-1].line_number
+                paths.append(open_path)
+                continue
+            
+            paths.append(ExtrusionPath(
+                moves=path_moves,
+                feature_type=features[feature_index] if feature_index >= 0 else state.current_feature,
+                start_line=path_moves[0].line_number,
+                end_line=path_moves[-1].line_number
+            ))
         
-        # Chiudi ultimo percorso
-        if current_path and current_path.moves:
-            current_path.end_line = current_path.moves[-1].line_number
-            paths.append(current_path)
+        # Indice del percorso di ogni linea (-1 se non è un movimento):
+        # 4 byte per linea invece di una mappa linea -> percorso
+        line_path = np.full(len(commands), -1, dtype=np.int32)
+        path_sizes = np.diff(np.array(path_starts + [len(moves)], dtype=np.int64))
+        line_path[moves_at] = np.repeat(np.arange(len(paths)), path_sizes)
         
-        return paths
+        # Stato a fine analisi
+        state.x = float(x_after[-1])
+        state.y = float(y_after[-1])
+        state.z = float(z_after[-1])
+        state.e = float(e_after[-1])
+        state.f = float(f_after[-1])
+        state.relative_extrusion = bool(relative_after[-1])
+        if features:
+            state.current_feature = features[-1]
+        
+        return paths, line_path, closes
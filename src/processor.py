@@ -4,18 +4,47 @@ Processore G-code principale
 Orchestratore che coordina parsing, analisi e applicazione del pressure smoothing.
 """
 
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import Deque, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+import io
 import time
 
-from .gcode_parser import GCodeParser, GCodeCommand, write_gcode
-from .path_analyzer import PathAnalyzer, ExtrusionPath, ExtrusionMove, MachineState, Point
+import numpy as np
+
+from .gcode_parser import (
+    GCodeParser,
+    GCodeCommand,
+    GCodeLine,
+    IO_BUFFER_SIZE,
+    HAS_Z
+)
+from .path_analyzer import PathAnalyzer, ExtrusionPath, ExtrusionMove, MachineState
 from .smoothing import (
     CurveType, 
-    calculate_speed_factor, 
+    calculate_speed_factor_array,
     calculate_effective_ramps
 )
 
+# Codici di fase dei segmenti generati
+PHASE_STEADY = 0
+PHASE_RAMP_UP = 1
+PHASE_RAMP_DOWN = 2
+PHASE_NAMES = ("STEADY", "RAMP_UP", "RAMP_DOWN")
+
+# Massimo numero di linee invariate accumulate prima di una scrittura
+PASSTHROUGH_BATCH_LINES = 4096
+
+# Percorsi inviati insieme a un worker quando lo smoothing è parallelo
+PARALLEL_WINDOW_PATHS = 64
+
+
+def _per_segment(values: Iterable[float], count: int, num_segments: np.ndarray) -> np.ndarray:
+    """Colonna di un attributo dei movimenti, ripetuta per ogni segmento."""
+    column = np.fromiter(values, dtype=np.float64, count=count)
+    return np.repeat(column, num_segments)
+
 
 @dataclass
 class ProcessingStats:
@@ -52,6 +81,13 @@ class ProcessorConfig:
     
     # Feature types da processare (None = tutti)
     target_features: Optional[List[str]] = None
+    
+    # Processi per lo smoothing dei percorsi (1 = nessun parallelismo)
+    workers: int = 1
+    
+    def __post_init__(self) -> None:
+        if self.workers < 1:
+            raise ValueError(f"workers deve essere almeno 1 (ricevuto {self.workers})")
 
 
 class GCodeProcessor:
@@ -92,50 +128,113 @@ class GCodeProcessor:
         """Verifica se una posizione è in una zona di rampa."""
         return dist_from_start < ramp_up or dist_to_end < ramp_down
     
-    def _generate_segment_command(
+    def _segment_moves(
         self,
-        start_x: float, start_y: float, start_z: float, start_e: float,
-        end_x: float, end_y: float, end_z: float, end_e: float,
-        feedrate: float, phase: str, speed_factor: float,
-        has_z: bool
-    ) -> GCodeCommand:
-        """Genera un comando G1 per un segmento."""
-        params = {
-            "X": end_x,
-            "Y": end_y,
-            "E": end_e,
-            "F": feedrate
-        }
-        if has_z:
-            params["Z"] = end_z
-        
-        return GCodeCommand(
-            line_number=0,
-            raw_line="",
-            command="G1",
-            params=params,
-            comment=f"{phase} {speed_factor*100:.0f}%",
-            _modified=True
+        moves: List[ExtrusionMove],
+        move_starts: np.ndarray,
+        move_lengths: np.ndarray,
+        num_segments: np.ndarray,
+        total_length: float,
+        eff_ramp_up: float,
+        eff_ramp_down: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Calcola i segmenti di più movimenti di un percorso in un'unica passata.
+        
+        I dati dei movimenti sono ripetuti per segmento in colonne contigue
+        (struct of arrays), così lo speed factor di tutti i segmenti del
+        percorso richiede una sola chiamata vettoriale.
+        
+        Args:
+            moves: Movimenti da segmentare
+            move_starts: Distanza dall'inizio del percorso di ogni movimento
+            move_lengths: Lunghezza di ogni movimento
+            num_segments: Numero di segmenti di ogni movimento
+            
+        Returns:
+            Tuple di array (x, y, z, feedrate, speed_factor, fase) con un
+            elemento per segmento, movimento dopo movimento; le coordinate
+            sono quelle di fine segmento
+        """
+        count = len(moves)
+        
+        # Indice di ogni segmento nel proprio movimento
+        total_segments = int(num_segments.sum())
+        first_segment = np.cumsum(num_segments) - num_segments
+        seg_idx = np.arange(total_segments) - np.repeat(first_segment, num_segments)
+        
+        # Progresso nel movimento (0 to 1) a inizio e fine di ogni segmento
+        seg_count = np.repeat(num_segments, num_segments)
+        t0 = seg_idx / seg_count
+        t1 = (seg_idx + 1) / seg_count
+        
+        # Distanze all'inizio e alla fine dei segmenti
+        start_dist = np.repeat(move_starts, num_segments)
+        length = np.repeat(move_lengths, num_segments)
+        seg_start_dist = start_dist + length * t0
+        seg_end_dist = start_dist + length * t1
+        seg_mid_dist = (seg_start_dist + seg_end_dist) / 2
+        
+        # Speed factor calcolato sulla distanza media di ogni segmento
+        speed_factors = np.maximum(
+            calculate_speed_factor_array(
+                seg_mid_dist,
+                total_length - seg_mid_dist,
+                eff_ramp_up,
+                eff_ramp_down,
+                self.config.ramp_up_curve,
+                self.config.ramp_down_curve
+            ),
+            self.config.min_speed_ratio
+        )
+        
+        # Interpola coordinate XYZ di fine segmento
+        sx = _per_segment((move.sx for move in moves), count, num_segments)
+        sy = _per_segment((move.sy for move in moves), count, num_segments)
+        sz = _per_segment((move.sz for move in moves), count, num_segments)
+        ex = _per_segment((move.ex for move in moves), count, num_segments)
+        ey = _per_segment((move.ey for move in moves), count, num_segments)
+        ez = _per_segment((move.ez for move in moves), count, num_segments)
+        seg_x = sx + (ex - sx) * t1
+        seg_y = sy + (ey - sy) * t1
+        seg_z = sz + (ez - sz) * t1
+        
+        # Fase basata sulla distanza di inizio segmento
+        phases = np.where(
+            seg_start_dist < eff_ramp_up,
+            PHASE_RAMP_UP,
+            np.where(
+                (total_length - seg_start_dist) < eff_ramp_down,
+                PHASE_RAMP_DOWN,
+                PHASE_STEADY
+            )
         )
+        
+        feedrates = _per_segment((move.feedrate for move in moves), count, num_segments) * speed_factors
+        
+        return seg_x, seg_y, seg_z, feedrates, speed_factors, phases
     
     def _apply_smoothing_to_path(
         self, 
         path: ExtrusionPath
-    ) -> List[GCodeCommand]:
+    ) -> List[GCodeLine]:
         """
         Applica pressure smoothing a un percorso di estrusione.
         
         Modifica il feedrate (F) per creare accelerazione/decelerazione
         graduale, mantenendo invariato il volume di estrusione (E).
         Segmenta i movimenti lunghi nelle zone di rampa per transizioni graduali.
+        I comandi del percorso non vengono modificati: quelli non segmentati
+        sono restituiti come copie con il nuovo feedrate.
         
         Args:
             path: Percorso da processare
             
         Returns:
-            Lista di comandi G-code modificati
+            Lista di comandi G-code modificati; le linee generate (commenti
+            e segmenti) sono già formattate come stringhe
         """
-        result: List[GCodeCommand] = []
+        result: List[GCodeLine] = []
         
         # Calcola rampe effettive
         eff_ramp_up, eff_ramp_down = calculate_effective_ramps(
@@ -148,105 +247,88 @@ class GCodeProcessor:
         resolution = self.config.segment_resolution
         
         # Aggiungi commento di inizio
-        result.append(GCodeCommand(
-            line_number=0,
-            raw_line="",
-            comment=f"PRESSURE_SMOOTHING_START: {path.feature_type}, length={total_length:.2f}mm",
-            _modified=True
-        ))
-        result.append(GCodeCommand(
-            line_number=0,
-            raw_line="",
-            comment=f"Ramps: up={eff_ramp_up:.2f}mm ({self.config.ramp_up_curve.value}), down={eff_ramp_down:.2f}mm ({self.config.ramp_down_curve.value})",
-            _modified=True
-        ))
-        
-        # Calcola distanza cumulativa per ogni movimento
-        cumulative_distance = 0.0
-        
-        for move in path.moves:
-            move_start_dist = cumulative_distance
-            move_end_dist = cumulative_distance + move.length
-            
-            # Coordinate del movimento
-            sx, sy, sz = move.start_point.x, move.start_point.y, move.start_point.z
-            ex, ey, ez = move.end_point.x, move.end_point.y, move.end_point.z
-            se, ee = move.start_point.e, move.end_point.e
-            has_z = "Z" in move.command.params
-            
-            # Verifica se il movimento attraversa zone di rampa
-            in_ramp_up = move_start_dist < eff_ramp_up
-            in_ramp_down = move_end_dist > (total_length - eff_ramp_down)
-            needs_segmentation = (in_ramp_up or in_ramp_down) and move.length > resolution
-            
-            if needs_segmentation:
-                # Segmenta il movimento
-                num_segments = max(2, int(move.length / resolution))
+        result.append(
+            f";PRESSURE_SMOOTHING_START: {path.feature_type}, length={total_length:.2f}mm"
+        )
+        result.append(
+            f";Ramps: up={eff_ramp_up:.2f}mm ({self.config.ramp_up_curve.value}), down={eff_ramp_down:.2f}mm ({self.config.ramp_down_curve.value})"
+        )
+        
+        # Distanza cumulativa all'inizio di ogni movimento, in un'unica
+        # passata (np.cumsum somma in ordine, come l'accumulo scalare)
+        lengths = np.fromiter(
+            (move.length for move in path.moves),
+            dtype=np.float64,
+            count=len(path.moves)
+        )
+        starts = np.empty_like(lengths)
+        if len(lengths):
+            starts[0] = 0.0
+            np.cumsum(lengths[:-1], out=starts[1:])
+        
+        # Tabella degli speed factor a metà di ogni movimento, calcolata una
+        # sola volta per percorso (usata dai movimenti non segmentati)
+        dist_mids = starts + lengths / 2
+        mid_factors = np.maximum(
+            calculate_speed_factor_array(
+                dist_mids,
+                total_length - dist_mids,
+                eff_ramp_up,
+                eff_ramp_down,
+                self.config.ramp_up_curve,
+                self.config.ramp_down_curve
+            ),
+            self.config.min_speed_ratio
+        )
+        
+        # Movimenti che attraversano zone di rampa e vanno segmentati
+        needs_segmentation = (
+            (starts < eff_ramp_up) | ((starts + lengths) > (total_length - eff_ramp_down))
+        ) & (lengths > resolution)
+        num_segments = np.where(
+            needs_segmentation,
+            np.maximum(2, (lengths / resolution).astype(np.int64)),
+            0
+        )
+        
+        # Segmenti di tutti i movimenti da segmentare, calcolati insieme
+        segmented = np.flatnonzero(needs_segmentation)
+        segment_columns = [[]] * 6
+        if len(segmented):
+            segments = self._segment_moves(
+                [path.moves[i] for i in segmented.tolist()],
+                starts[segmented], lengths[segmented], num_segments[segmented],
+                total_length, eff_ramp_up, eff_ramp_down
+            )
+            segment_columns = [column.tolist() for column in segments]
+        first_segment = 0
+        
+        for move, dist_mid, speed_factor, move_segments in zip(
+            path.moves, dist_mids.tolist(), mid_factors.tolist(), num_segments.tolist()
+        ):
+            if move_segments:
+                has_z = bool(move.command.param_mask & HAS_Z)
                 
                 # Estrusione per segmento (usa il delta relativo, non i valori assoluti)
-                e_per_segment = move.extrusion / num_segments
+                e_per_segment = move.extrusion / move_segments
                 
-                for seg_idx in range(num_segments):
-                    # Progresso nel movimento (0 to 1)
-                    t0 = seg_idx / num_segments
-                    t1 = (seg_idx + 1) / num_segments
-                    
-                    # Distanza all'inizio del segmento (non al centro)
-                    seg_start_dist = move_start_dist + move.length * t0
-                    seg_end_dist = move_start_dist + move.length * t1
-                    seg_mid_dist = (seg_start_dist + seg_end_dist) / 2
-                    
-                    # Usa distanza media per calcolare speed factor
-                    seg_dist_to_end = total_length - seg_mid_dist
-                    
-                    # Calcola speed factor per questo segmento
-                    speed_factor = calculate_speed_factor(
-                        seg_mid_dist,
-                        seg_dist_to_end,
-                        eff_ramp_up,
-                        eff_ramp_down,
-                        self.config.ramp_up_curve,
-                        self.config.ramp_down_curve
-                    )
-                    speed_factor = max(speed_factor, self.config.min_speed_ratio)
-                    
-                    # Interpola coordinate XYZ
-                    seg_ex = sx + (ex - sx) * t1
-                    seg_ey = sy + (ey - sy) * t1
-                    seg_ez = sz + (ez - sz) * t1
-                    
-                    # Determina fase basata sulla distanza di inizio segmento
-                    if seg_start_dist < eff_ramp_up:
-                        phase = "RAMP_UP"
-                    elif (total_length - seg_start_dist) < eff_ramp_down:
-                        phase = "RAMP_DOWN"
-                    else:
-                        phase = "STEADY"
-                    
-                    # Calcola feedrate
-                    new_feedrate = move.feedrate * speed_factor
-                    
-                    cmd = self._generate_segment_command(
-                        sx + (ex - sx) * t0, sy + (ey - sy) * t0, sz + (ez - sz) * t0, 0,
-                        seg_ex, seg_ey, seg_ez, e_per_segment,
-                        new_feedrate, phase, speed_factor, has_z
+                # Linee G1 formattate direttamente, con lo stesso formato di
+                # GCodeCommand.to_gcode (X Y [Z] E F ;commento)
+                e_text = f"E{e_per_segment:.5f}"
+                last_segment = first_segment + move_segments
+                for seg_ex, seg_ey, seg_ez, new_feedrate, seg_factor, phase in zip(
+                    *(column[first_segment:last_segment] for column in segment_columns)
+                ):
+                    z_text = f" Z{seg_ez:.3f}" if has_z else ""
+                    result.append(
+                        f"G1 X{seg_ex:.3f} Y{seg_ey:.3f}{z_text} {e_text} F{new_feedrate:.1f}"
+                        f" ;{PHASE_NAMES[phase]} {seg_factor*100:.0f}%"
                     )
-                    result.append(cmd)
+                first_segment = last_segment
             else:
-                # Movimento non necessita segmentazione
-                dist_mid = move_start_dist + move.length / 2
+                # Movimento non necessita segmentazione: speed factor dalla tabella
                 dist_to_end = total_length - dist_mid
                 
-                speed_factor = calculate_speed_factor(
-                    dist_mid,
-                    dist_to_end,
-                    eff_ramp_up,
-                    eff_ramp_down,
-                    self.config.ramp_up_curve,
-                    self.config.ramp_down_curve
-                )
-                speed_factor = max(speed_factor, self.config.min_speed_ratio)
-                
                 new_feedrate = move.feedrate * speed_factor
                 
                 # Determina fase
@@ -257,113 +339,96 @@ class GCodeProcessor:
                 else:
                     phase = "STEADY"
                 
-                new_params = move.command.params.copy()
-                new_params["F"] = new_feedrate
-                
-                original_comment = move.command.comment or ""
-                new_comment = f"{original_comment} ; {phase}" if original_comment else phase
-                
-                new_cmd = GCodeCommand(
-                    line_number=move.command.line_number,
-                    raw_line=move.command.raw_line,
-                    command="G1",
-                    params=new_params,
-                    comment=new_comment,
-                    _modified=True
-                )
-                result.append(new_cmd)
-            
-            cumulative_distance = move_end_dist
+                # Copia del comando con override di F e commento: il comando
+                # originale (e quindi il programma del chiamante) resta
+                # invariato; params è condiviso, non viene modificato
+                cmd = move.command
+                result.append(GCodeCommand(
+                    line_number=cmd.line_number,
+                    raw_line=cmd.raw_line,
+                    command=cmd.command,
+                    params=cmd.params,
+                    comment=cmd.comment,
+                    code=cmd.code,
+                    param_mask=cmd.param_mask,
+                    _modified=True,
+                    feedrate_override=new_feedrate,
+                    comment_append=phase
+                ))
         
         # Aggiungi commento di fine
-        result.append(GCodeCommand(
-            line_number=0,
-            raw_line="",
-            comment="PRESSURE_SMOOTHING_END",
-            _modified=True
-        ))
+        result.append(";PRESSURE_SMOOTHING_END")
         
         return result
     
-    def process_file(self, input_path: str, output_path: str) -> ProcessingStats:
+    def process_file(
+        self,
+        input_path: str,
+        output_path: Optional[str],
+        return_content: bool = False
+    ) -> Union[ProcessingStats, Tuple[ProcessingStats, bytes]]:
         """
         Processa un file G-code applicando pressure smoothing.
         
         Args:
             input_path: Percorso del file G-code di input
-            output_path: Percorso del file G-code di output
+            output_path: Percorso del file G-code di output, oppure None per
+                non scrivere su disco (richiede return_content)
+            return_content: Se True, restituisce anche il contenuto scritto,
+                evitando al chiamante di rileggere il file di output
             
         Returns:
-            Statistiche del processing
+            Statistiche del processing, oppure tupla (stats, contenuto in bytes)
+            se return_content è True
         """
+        if output_path is None and not return_content:
+            raise ValueError("output_path è None: usare return_content=True")
+        
         start_time = time.time()
         
         # Reset stats
         self.stats = ProcessingStats()
         
-        # 1. Parsa il file
+        # Parsing, analisi e scrittura procedono insieme, blocco per blocco:
+        # in memoria restano solo il blocco corrente e il percorso aperto
         print(f"Parsing: {input_path}")
-        commands = self.parser.parse_file(input_path)
-        self.stats.input_lines = len(commands)
-        print(f"  Linee lette: {self.stats.input_lines}")
-        
-        # 2. Analizza e identifica percorsi
         print("Analisi percorsi di estrusione...")
-        paths = self.analyzer.analyze(commands)
-        self.stats.paths_found = len(paths)
-        print(f"  Percorsi trovati: {self.stats.paths_found}")
-        
-        # 3. Crea mappa linea -> percorso per sostituzione efficiente
-        line_to_path: Dict[int, ExtrusionPath] = {}
-        lines_to_remove: set = set()  # Linee da rimuovere (percorsi troppo corti)
-        
-        for path in paths:
-            if self._should_process_path(path):
-                for move in path.moves:
-                    line_to_path[move.line_number] = path
-                self.stats.paths_processed += 1
-                self.stats.total_path_length += path.total_length
-            else:
-                # Percorso troppo corto - rimuovi completamente
-                for move in path.moves:
-                    lines_to_remove.add(move.line_number)
-                self.stats.paths_skipped += 1
-        
-        print(f"  Percorsi da processare: {self.stats.paths_processed}")
-        print(f"  Percorsi saltati (rimossi): {self.stats.paths_skipped}")
+        if output_path is not None:
+            print(f"Scrittura: {output_path}")
         
-        # 4. Genera output
-        print("Generazione output...")
-        output_commands: List[GCodeCommand] = []
-        processed_paths: set = set()
+        if return_content:
+            out = io.StringIO()
+        else:
+            out = open(output_path, "w", encoding="utf-8", buffering=IO_BUFFER_SIZE)
         
-        for cmd in commands:
-            line_num = cmd.line_number
+        executor = None
+        try:
+            if self.config.workers > 1:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.config.workers,
+                    initializer=_init_worker,
+                    initargs=(self.config,)
+                )
             
-            # Salta linee da rimuovere (percorsi troppo corti)
-            if line_num in lines_to_remove:
-                continue
+            stream = self.analyzer.analyze_stream(
+                self.parser.parse_stream(input_path)
+            )
+            self._write_stream(stream, out, executor)
             
-            # Verifica se questa linea fa parte di un percorso da processare
-            if line_num in line_to_path:
-                path = line_to_path[line_num]
-                path_id = path.start_line  # Usa start_line come ID unico
-                
-                # Processa il percorso solo la prima volta che lo incontriamo
-                if path_id not in processed_paths:
-                    processed_paths.add(path_id)
-                    smoothed_commands = self._apply_smoothing_to_path(path)
-                    output_commands.extend(smoothed_commands)
-                # Altrimenti salta (già processato)
-            else:
-                # Linea non parte di un percorso - copia direttamente
-                output_commands.append(cmd)
-        
-        self.stats.output_lines = len(output_commands)
+            if return_content:
+                content = out.getvalue().encode("utf-8")
+                if output_path is not None:
+                    with open(output_path, "wb", buffering=IO_BUFFER_SIZE) as f:
+                        f.write(content)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            out.close()
         
-        # 5. Scrivi output
-        print(f"Scrittura: {output_path}")
-        write_gcode(output_commands, output_path)
+        print(f"  Linee lette: {self.stats.input_lines}")
+        print(f"  Percorsi trovati: {self.stats.paths_found}")
+        print(f"  Percorsi da processare: {self.stats.paths_processed}")
+        print(f"  Percorsi saltati (rimossi): {self.stats.paths_skipped}")
         
         # Calcola tempo totale
         self.stats.processing_time = time.time() - start_time
@@ -372,4 +437,135 @@ class GCodeProcessor:
         print(f"  Input: {self.stats.input_lines} linee")
         print(f"  Output: {self.stats.output_lines} linee")
         
+        if return_content:
+            return self.stats, content
         return self.stats
+    
+    def _smooth_path_text(self, path: ExtrusionPath) -> Tuple[str, int]:
+        """
+        Testo G-code di un percorso processato.
+        
+        Returns:
+            Tuple (linee terminate da newline, numero di linee)
+        """
+        smoothed = [
+            line if isinstance(line, str) else line.to_gcode()
+            for line in self._apply_smoothing_to_path(path)
+        ]
+        return "\n".join(smoothed) + "\n", len(smoothed)
+    
+    def _write_stream(
+        self,
+        stream: Iterator[Union[GCodeCommand, ExtrusionPath]],
+        out: TextIO,
+        executor: Optional[ProcessPoolExecutor] = None
+    ) -> None:
+        """
+        Scrive l'output mentre l'analisi emette linee e percorsi chiusi.
+        
+        Con un executor i percorsi vengono processati nei worker a finestre
+        di PARALLEL_WINDOW_PATHS percorsi; l'output resta nell'ordine del file.
+        
+        Args:
+            stream: Linee da copiare e percorsi chiusi (analyze_stream)
+            out: File di testo di destinazione
+            executor: Pool di processi per lo smoothing (None = sequenziale)
+        """
+        stats = self.stats
+        write = out.write
+        
+        # Linee invariate consecutive: scritte in blocco col testo originale
+        passthrough: List[str] = []
+        
+        # Finestra corrente (solo con executor): testi pronti e indici dei
+        # percorsi da processare; le finestre inviate attendono in coda
+        window: List[Union[str, int]] = []
+        window_paths: List[ExtrusionPath] = []
+        in_flight: Deque[Tuple[List[Union[str, int]], Future]] = deque()
+        max_in_flight = 2 * self.config.workers
+        emit = write if executor is None else window.append
+        
+        for item in stream:
+            if isinstance(item, ExtrusionPath):
+                if passthrough:
+                    emit("\n".join(passthrough) + "\n")
+                    passthrough.clear()
+                
+                stats.paths_found += 1
+                stats.input_lines += item.move_count
+                
+                if self._should_process_path(item):
+                    stats.paths_processed += 1
+                    stats.total_path_length += item.total_length
+                    if executor is None:
+                        text, line_count = self._smooth_path_text(item)
+                        write(text)
+                        stats.output_lines += line_count
+                    else:
+                        window.append(len(window_paths))
+                        window_paths.append(item)
+                        if len(window_paths) >= PARALLEL_WINDOW_PATHS:
+                            in_flight.append(
+                                (window[:], executor.submit(_smooth_paths, window_paths[:]))
+                            )
+                            window.clear()
+                            window_paths.clear()
+                            if len(in_flight) > max_in_flight:
+                                self._write_window(*in_flight.popleft(), out)
+                else:
+                    # Percorso troppo corto - rimosso completamente
+                    stats.paths_skipped += 1
+            else:
+                # Linea non parte di un percorso - copia direttamente:
+                # i comandi non modificati non passano da to_gcode()
+                stats.input_lines += 1
+                stats.output_lines += 1
+                passthrough.append(
+                    item.to_gcode() if item._modified else item.raw_line
+                )
+                if len(passthrough) >= PASSTHROUGH_BATCH_LINES:
+                    emit("\n".join(passthrough) + "\n")
+                    passthrough.clear()
+        
+        if passthrough:
+            emit("\n".join(passthrough) + "\n")
+        
+        if executor is not None:
+            while in_flight:
+                self._write_window(*in_flight.popleft(), out)
+            if window_paths:
+                self._write_window(window, executor.submit(_smooth_paths, window_paths), out)
+            elif window:
+                # Solo testo invariato: nessun percorso da inviare al pool
+                out.write("".join(window))
+    
+    def _write_window(
+        self,
+        window: List[Union[str, int]],
+        results: Future,
+        out: TextIO
+    ) -> None:
+        """Scrive una finestra attendendo i percorsi processati dai worker."""
+        texts = results.result()
+        for piece in window:
+            if isinstance(piece, str):
+                out.write(piece)
+            else:
+                text, line_count = texts[piece]
+                out.write(text)
+                self.stats.output_lines += line_count
+
+
+# Processore di ogni worker del pool, creato da _init_worker
+_worker_processor: Optional[GCodeProcessor] = None
+
+
+def _init_worker(config: ProcessorConfig) -> None:
+    """Inizializza il processore di un worker con la configurazione data."""
+    global _worker_processor
+    _worker_processor = GCodeProcessor(config)
+
+
+def _smooth_paths(paths: List[ExtrusionPath]) -> List[Tuple[str, int]]:
+    """Processa una finestra di percorsi in un worker."""
+    return [_worker_processor._smooth_path_text(path) for path in paths]
@@ -6,7 +6,13 @@ Gestisce le curve matematiche per accelerazione/decelerazione della pressione.
 
 import math
 from enum import Enum
-from typing import Callable
+from typing import Callable, Dict
+
+import numpy as np
+
+# Costanti delle curve, calcolate una sola volta
+_EXP2_MINUS_1 = math.exp(2) - 1
+_E_MINUS_1 = math.e - 1
 
 
 class CurveType(Enum):
@@ -19,6 +25,78 @@ class CurveType(Enum):
     SCURVE = "scurve"
 
 
+# Ogni curva ha una versione scalare (math, usata da apply_curve) e una
+# vettoriale (NumPy, usata da apply_curve_array) con la stessa formula,
+# definite una accanto all'altra; i risultati possono differire solo
+# nell'ultima cifra (math.exp e np.exp arrotondano in modo diverso)
+def _exponential_curve(progress: float) -> float:
+    # Accelerazione rapida iniziale, poi rallenta
+    return (math.exp(progress * 2) - 1) / _EXP2_MINUS_1
+
+
+def _exponential_curve_array(progress: np.ndarray) -> np.ndarray:
+    return (np.exp(progress * 2) - 1) / _EXP2_MINUS_1
+
+
+def _logarithmic_curve(progress: float) -> float:
+    # Accelerazione lenta iniziale, poi accelera
+    return math.log(1 + progress * _E_MINUS_1)
+
+
+def _logarithmic_curve_array(progress: np.ndarray) -> np.ndarray:
+    return np.log(1 + progress * _E_MINUS_1)
+
+
+def _sigmoid_curve(progress: float) -> float:
+    # Curva a S centrata - smooth all'inizio e alla fine
+    return 1 / (1 + math.exp(-10 * (progress - 0.5)))
+
+
+def _sigmoid_curve_array(progress: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-10 * (progress - 0.5)))
+
+
+def _quadratic_curve(progress):
+    # Accelerazione quadratica (stessa espressione per float e array)
+    return progress * progress
+
+
+def _scurve_curve(progress: float) -> float:
+    # S-Curve ottimizzata per pellet extruder
+    # Prima metà: accelerazione quadratica
+    # Seconda metà: decelerazione quadratica
+    if progress < 0.5:
+        return 2 * progress * progress
+    return 1 - 2 * (1 - progress) * (1 - progress)
+
+
+def _scurve_curve_array(progress: np.ndarray) -> np.ndarray:
+    return np.where(
+        progress < 0.5,
+        2 * progress * progress,
+        1 - 2 * (1 - progress) * (1 - progress)
+    )
+
+
+# Funzione di ogni curva: dispatch con un solo lookup invece di una
+# catena di confronti (LINEAR è l'identità e non ha una funzione)
+_CURVE_FUNCTIONS: Dict[CurveType, Callable[[float], float]] = {
+    CurveType.EXPONENTIAL: _exponential_curve,
+    CurveType.LOGARITHMIC: _logarithmic_curve,
+    CurveType.SIGMOID: _sigmoid_curve,
+    CurveType.QUADRATIC: _quadratic_curve,
+    CurveType.SCURVE: _scurve_curve,
+}
+
+_CURVE_ARRAY_FUNCTIONS: Dict[CurveType, Callable[[np.ndarray], np.ndarray]] = {
+    CurveType.EXPONENTIAL: _exponential_curve_array,
+    CurveType.LOGARITHMIC: _logarithmic_curve_array,
+    CurveType.SIGMOID: _sigmoid_curve_array,
+    CurveType.QUADRATIC: _quadratic_curve,
+    CurveType.SCURVE: _scurve_curve_array,
+}
+
+
 def apply_curve(progress: float, curve_type: CurveType) -> float:
     """
     Applica una curva di smoothing al progresso.
@@ -30,39 +108,39 @@ def apply_curve(progress: float, curve_type: CurveType) -> float:
     Returns:
         Valore trasformato tra 0.0 e 1.0
     """
-    # Clamp del progresso tra 0 e 1
-    progress = max(0.0, min(1.0, progress))
-    
-    if curve_type == CurveType.LINEAR:
+    # Clamp del progresso tra 0 e 1 (NaN -> 1.0, -0.0 -> 0.0 come con max/min)
+    if progress <= 0.0:
+        progress = 0.0
+    elif not progress < 1.0:
+        progress = 1.0
+    
+    curve = _CURVE_FUNCTIONS.get(curve_type)
+    if curve is None:
         return progress
+    return curve(progress)
+
+
+def apply_curve_array(progress: np.ndarray, curve_type: CurveType) -> np.ndarray:
+    """
+    Versione vettoriale di apply_curve su un array di progressi.
     
-    elif curve_type == CurveType.EXPONENTIAL:
-        # Accelerazione rapida iniziale, poi rallenta
-        return (math.exp(progress * 2) - 1) / (math.exp(2) - 1)
-    
-    elif curve_type == CurveType.LOGARITHMIC:
-        # Accelerazione lenta iniziale, poi accelera
-        return math.log(1 + progress * (math.e - 1))
-    
-    elif curve_type == CurveType.SIGMOID:
-        # Curva a S centrata - smooth all'inizio e alla fine
-        return 1 / (1 + math.exp(-10 * (progress - 0.5)))
-    
-    elif curve_type == CurveType.QUADRATIC:
-        # Accelerazione quadratica
-        return progress * progress
+    Valuta la curva con un'unica operazione NumPy per tipo, invece di
+    una chiamata Python per ogni punto.
     
-    elif curve_type == CurveType.SCURVE:
-        # S-Curve ottimizzata per pellet extruder
-        # Prima metà: accelerazione quadratica
-        # Seconda metà: decelerazione quadratica
-        if progress < 0.5:
-            return 2 * progress * progress
-        else:
-            return 1 - 2 * (1 - progress) * (1 - progress)
+    Args:
+        progress: Array di valori tra 0.0 e 1.0
+        curve_type: Tipo di curva da applicare
+        
+    Returns:
+        Array di valori trasformati tra 0.0 e 1.0
+    """
+    # Clamp del progresso tra 0 e 1
+    progress = np.clip(np.asarray(progress, dtype=np.float64), 0.0, 1.0)
     
-    else:
+    curve = _CURVE_ARRAY_FUNCTIONS.get(curve_type)
+    if curve is None:
         return progress
+    return curve(progress)
 
 
 def calculate_speed_factor(
@@ -103,6 +181,47 @@ def calculate_speed_factor(
     return 1.0
 
 
+def calculate_speed_factor_array(
+    distance_from_start: np.ndarray,
+    distance_to_end: np.ndarray,
+    ramp_up_length: float,
+    ramp_down_length: float,
+    ramp_up_curve: CurveType,
+    ramp_down_curve: CurveType
+) -> np.ndarray:
+    """
+    Versione vettoriale di calculate_speed_factor su array di posizioni.
+    
+    Args:
+        distance_from_start: Distanze dall'inizio del percorso (mm)
+        distance_to_end: Distanze dalla fine del percorso (mm)
+        ramp_up_length: Lunghezza della rampa di accelerazione (mm)
+        ramp_down_length: Lunghezza della rampa di decelerazione (mm)
+        ramp_up_curve: Tipo di curva per ramp-up
+        ramp_down_curve: Tipo di curva per ramp-down
+        
+    Returns:
+        Array di fattori di velocità tra 0.0 e 1.0
+    """
+    factors = np.ones(len(distance_from_start))
+    
+    # Zona di ramp-up (ha la precedenza, come nella versione scalare)
+    in_ramp_up = distance_from_start < ramp_up_length
+    if in_ramp_up.any():
+        factors[in_ramp_up] = apply_curve_array(
+            distance_from_start[in_ramp_up] / ramp_up_length, ramp_up_curve
+        )
+    
+    # Zona di ramp-down
+    in_ramp_down = ~in_ramp_up & (distance_to_end < ramp_down_length)
+    if in_ramp_down.any():
+        factors[in_ramp_down] = apply_curve_array(
+            distance_to_end[in_ramp_down] / ramp_down_length, ramp_down_curve
+        )
+    
+    return factors
+
+
 def calculate_effective_ramps(
     path_length: float,
     ramp_up_length: float,
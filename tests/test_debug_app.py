@@ -0,0 +1,39 @@
+"""Test dell'estrazione dei punti di visualizzazione della debug UI."""
+
+import pytest
+
+# debug_app è uno script Streamlit: l'import esegue la pagina in bare mode
+pytest.importorskip("streamlit")
+from debug_app import E_PATTERN, _scan_points  # noqa: E402
+
+
+def test_scan_points_command_separators():
+    lines = [
+        b"G1 X1 Y1 E1\n",
+        b"G1\tX2 Y2 E2\n",
+        b"  G0 X3 Y3 ; travel\n",
+        b"G1\n",
+        b"G1 F1500\n",
+        b"G1 X4 Y4 E3\n",
+        b"G10 X9 Y9\n",
+        b"M83\n",
+        b"G1 X5 Y5 E-1\n",
+    ]
+
+    points = _scan_points(lines)
+
+    assert points["x"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert points["extrusion"].tolist() == [True, True, False, True, False]
+    assert points["f"].tolist() == [1000.0, 1000.0, 1000.0, 1500.0, 1500.0]
+
+
+@pytest.mark.parametrize("line, expected", [
+    (b"G92 E0", [b"0"]),
+    (b"G92 E-.5", [b"-.5"]),
+    (b"G92 E5.", [b"5"]),
+    (b"G92 E.1", [b".1"]),
+    (b"G92 E1.2.3", [b"1.2"]),
+    (b"G92 E-", []),
+])
+def test_e_pattern(line, expected):
+    assert E_PATTERN.findall(line) == expected
@@ -0,0 +1,58 @@
+"""Test del parsing di valori numerici G-code (punto iniziale, segno)."""
+
+from src.gcode_parser import (
+    CMD_G0,
+    CMD_G1,
+    CMD_G92,
+    CMD_OTHER,
+    HAS_E,
+    HAS_F,
+    HAS_X,
+    HAS_Y,
+    GCodeCommand,
+    GCodeParser,
+)
+
+
+def test_parse_line_leading_dot_and_negative():
+    cmd = GCodeParser().parse_line("G1 X-.5 Y5. E.1\n", 7)
+
+    assert cmd.command == "G1"
+    assert cmd.code == CMD_G1
+    assert cmd.params == {"X": -0.5, "Y": 5.0, "E": 0.1}
+    assert cmd.param_mask == HAS_X | HAS_Y | HAS_E
+    assert cmd.line_number == 7
+    assert cmd.raw_line == "G1 X-.5 Y5. E.1"
+
+
+def test_command_built_without_parser():
+    # Codice e bit dei parametri derivati da command e params
+    extrusion = GCodeCommand(1, "", command="G1", params={"X": 1.0, "E": 0.5, "F": 900.0})
+    travel = GCodeCommand(2, "", command="G0", params={"Y": 2.0})
+    feedrate = GCodeCommand(3, "", command="G1", params={"F": 1200.0})
+    other = GCodeCommand(4, "", command="M104", params={"S": 200.0})
+
+    assert (extrusion.code, extrusion.param_mask) == (CMD_G1, HAS_X | HAS_E | HAS_F)
+    assert extrusion.is_movement and extrusion.is_extrusion_move
+    assert not extrusion.is_travel_move
+    assert travel.code == CMD_G0
+    assert travel.is_movement and travel.is_travel_move
+    assert feedrate.is_movement
+    assert not feedrate.is_extrusion_move and not feedrate.is_travel_move
+    assert (other.code, other.param_mask) == (CMD_OTHER, 0)
+    assert not other.is_movement
+
+
+def test_parse_line_negative_e_reset():
+    cmd = GCodeParser().parse_line("G92 E-.25 ; reset")
+
+    assert cmd.code == CMD_G92
+    assert cmd.params == {"E": -0.25}
+    assert cmd.comment == "reset"
+
+
+def test_parse_line_irregular_tokens_use_pattern():
+    # Token non separati e doppio punto passano dal pattern di fallback
+    cmd = GCodeParser().parse_line("G1 X1Y-.5 E1.2.3")
+
+    assert cmd.params == {"X": 1.0, "Y": -0.5, "E": 1.2}
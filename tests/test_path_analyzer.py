@@ -0,0 +1,227 @@
+"""Test dell'analisi dei percorsi di estrusione (a blocchi e vettoriale)."""
+
+import math
+
+import pytest
+
+from src.gcode_parser import GCodeParser, ParsedProgram
+from src.path_analyzer import ExtrusionPath, PathAnalyzer
+
+# Programma di esempio: cambi di feature, wipe, travel, comandi solo F/Z,
+# retrazioni, reset G92 e cambi di modalità M82/M83
+FIXTURE = """\
+;TYPE:Outer wall
+G92 E0
+G1 Z0.2 F600
+G0 X10 Y10
+G1 X20 Y10 E1.0 F1800
+G1 X20 Y20 E2.0
+G1 F1200
+G1 X10 Y20 E3.0
+G1 X10 Y10 E2.5 ; retrazione
+G1 X12 Y12 E3.5
+;WIPE_START
+G1 X14 Y14 E3.6
+;WIPE_END
+G1 X16 Y12 E4.0
+;TYPE:Inner wall
+G1 X18 Y12 E4.5
+G1 Z0.4
+G1 X18 Y14 E5.0
+G0 X0 Y0
+M83
+G1 X5 Y0 E0.4
+G1 X5 Y5 E.3 F900
+G1 X5 Y5 E-0.8
+G1 X0 Y5 E0.8
+G92 E0
+G1 X0 Y0 E0.2
+M82
+G92 E1
+G1 X3 Y4 E1.5
+G1 Y8 E2.0 ; solo Y
+"""
+
+
+def _parse(text: str):
+    parser = GCodeParser()
+    return [
+        parser.parse_line(line, num)
+        for num, line in enumerate(text.splitlines(), start=1)
+    ]
+
+
+def _blocks(commands, size):
+    """Divide i comandi in blocchi consecutivi, come parse_stream."""
+    return [
+        ParsedProgram.from_commands(commands[i:i + size])
+        for i in range(0, len(commands), size)
+    ]
+
+
+def _summary(paths):
+    """Dati confrontabili di una lista di percorsi."""
+    return [
+        (
+            path.feature_type,
+            path.start_line,
+            path.end_line,
+            [
+                (m.line_number, m.sx, m.sy, m.sz, m.se, m.ex, m.ey, m.ez, m.ee,
+                 m.length, m.extrusion, m.feedrate)
+                for m in path.moves
+            ],
+        )
+        for path in paths
+    ]
+
+
+def _reference_paths(commands):
+    """
+    Analizzatore scalare di riferimento: una linea alla volta, con la
+    stessa logica dell'analizzatore prima della versione vettoriale.
+    """
+    x = y = z = e = 0.0
+    f = 1200.0
+    relative = False
+    feature = "unknown"
+    paths = []
+    current = None
+
+    def close():
+        nonlocal current
+        if current is not None:
+            paths.append(current)
+            current = None
+
+    for cmd in commands:
+        params = cmd.params
+        if cmd.comment and "TYPE:" in cmd.comment.upper():
+            close()
+            feature = cmd.comment.split(":")[-1].strip()
+
+        if cmd.comment and ("WIPE_START" in cmd.comment or "WIPE_END" in cmd.comment):
+            close()
+            continue
+
+        if cmd.command in ("M82", "M83", "G92"):
+            close()
+            if cmd.command == "M82":
+                relative = False
+            elif cmd.command == "M83":
+                relative = True
+            else:
+                e = params.get("E", e)
+                x = params.get("X", x)
+                y = params.get("Y", y)
+                z = params.get("Z", z)
+            continue
+
+        if cmd.command not in ("G0", "G1"):
+            continue
+
+        is_extrusion = (
+            cmd.command == "G1"
+            and ("X" in params or "Y" in params)
+            and "E" in params
+            and (params["E"] > 0 if relative else params["E"] > e)
+        )
+        end_x, end_y, end_z = params.get("X", x), params.get("Y", y), params.get("Z", z)
+        end_f = params.get("F", f)
+        end_e = e
+        if "E" in params:
+            end_e = e + params["E"] if relative else params["E"]
+
+        if is_extrusion:
+            if current is None:
+                current = (feature, [])
+            length = math.sqrt((end_x - x) ** 2 + (end_y - y) ** 2)
+            extrusion = params["E"] if relative else params["E"] - e
+            current[1].append((
+                cmd.line_number, x, y, z, e, end_x, end_y, end_z, end_e,
+                length, extrusion, end_f
+            ))
+        elif "X" in params or "Y" in params or "Z" in params:
+            close()
+
+        x, y, z, e, f = end_x, end_y, end_z, end_e, end_f
+
+    close()
+    return [
+        (feat, moves[0][0], moves[-1][0], moves)
+        for feat, moves in paths
+    ]
+
+
+def test_analyze_matches_scalar_reference():
+    commands = _parse(FIXTURE)
+
+    paths = PathAnalyzer().analyze(commands)
+
+    assert _summary(paths) == _reference_paths(commands)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 1000])
+def test_analyze_stream_across_blocks(size):
+    commands = _parse(FIXTURE)
+    expected = _reference_paths(commands)
+
+    items = list(PathAnalyzer().analyze_stream(_blocks(commands, size)))
+    paths = [item for item in items if isinstance(item, ExtrusionPath)]
+
+    assert _summary(paths) == expected
+
+    # Ogni linea compare una sola volta: da sola o come movimento di un percorso
+    emitted = []
+    for item in items:
+        if isinstance(item, ExtrusionPath):
+            emitted.extend(move.line_number for move in item.moves)
+        else:
+            emitted.append(item.line_number)
+    assert sorted(emitted) == list(range(1, len(commands) + 1))
+
+
+def test_path_crossing_block_boundary():
+    commands = _parse(
+        "G0 X0 Y0\n"
+        "G1 X1 Y0 E1\n"
+        "G1 X2 Y0 E2\n"
+        "G1 X3 Y0 E3\n"
+        "G1 X4 Y0 E4\n"
+        "G0 X9 Y9\n"
+    )
+
+    # Il confine cade tra la linea 3 e la 4, a metà percorso
+    items = list(PathAnalyzer().analyze_stream(_blocks(commands, 3)))
+
+    assert isinstance(items[1], ExtrusionPath)
+    path = items[1]
+    assert [m.line_number for m in path.moves] == [2, 3, 4, 5]
+    assert (path.start_line, path.end_line) == (2, 5)
+    assert path.total_length == 4.0
+    assert path.total_extrusion == 4.0
+    assert [item.line_number for item in items if not isinstance(item, ExtrusionPath)] == [1, 6]
+
+
+def test_relative_extrusion_and_resets_inside_block():
+    commands = _parse(
+        "M83\n"
+        "G1 X1 Y0 E0.5\n"
+        "G1 X2 Y0 E0.5\n"
+        "G92 E0\n"
+        "G1 X3 Y0 E0.5\n"
+        "M82\n"
+        "G92 E0\n"
+        "G1 X4 Y0 E1.0\n"
+        "G1 X5 Y0 E1.5\n"
+    )
+
+    paths = PathAnalyzer().analyze(commands)
+
+    # G92 e M82 chiudono il percorso corrente
+    assert [[m.line_number for m in p.moves] for p in paths] == [[2, 3], [5], [8, 9]]
+    assert [[(m.se, m.ee, m.extrusion) for m in p.moves] for p in paths] == [
+        [(0.0, 0.5, 0.5), (0.5, 1.0, 0.5)],
+        [(0.0, 0.5, 0.5)],
+        [(0.0, 1.0, 1.0), (1.0, 1.5, 0.5)],
+    ]
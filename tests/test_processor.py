@@ -0,0 +1,97 @@
+"""Test del processing dei percorsi nel flusso a blocchi."""
+
+import pytest
+
+from src.gcode_parser import GCodeParser
+from src.processor import PARALLEL_WINDOW_PATHS, GCodeProcessor, ProcessorConfig
+
+GCODE = """\
+;TYPE:Outer wall
+G92 E0
+G0 X0 Y0
+G1 X0.5 Y0 E0.1 F1800
+G0 X10 Y0
+G1 X30 Y0 E1.0 F1800
+G0 X0 Y0
+"""
+
+
+def _process(tmp_path, config):
+    input_path = tmp_path / "input.gcode"
+    input_path.write_text(GCODE)
+    stats, content = GCodeProcessor(config).process_file(
+        str(input_path), None, return_content=True
+    )
+    return stats, content.decode("utf-8").splitlines()
+
+
+def test_path_shorter_than_min_length_is_skipped(tmp_path, capsys):
+    stats, lines = _process(tmp_path, ProcessorConfig(min_path_length=1.0))
+
+    assert stats.paths_found == 2
+    assert stats.paths_processed == 1
+    assert stats.paths_skipped == 1
+    assert stats.total_path_length == 20.0
+
+    # Il percorso corto (0.5mm) viene rimosso, le altre linee restano
+    assert "G1 X0.5 Y0 E0.1 F1800" not in lines
+    assert lines[:3] == [";TYPE:Outer wall", "G92 E0", "G0 X0 Y0"]
+    assert lines[3] == "G0 X10 Y0"
+    assert lines[4].startswith(";PRESSURE_SMOOTHING_START: Outer wall, length=20.00mm")
+    assert lines[-2] == ";PRESSURE_SMOOTHING_END"
+    assert lines[-1] == "G0 X0 Y0"
+
+
+def test_path_at_min_length_is_processed(tmp_path, capsys):
+    stats, _ = _process(tmp_path, ProcessorConfig(min_path_length=0.5))
+
+    assert stats.paths_processed == 2
+    assert stats.paths_skipped == 0
+
+
+def test_workers_must_be_positive():
+    with pytest.raises(ValueError):
+        ProcessorConfig(workers=0)
+
+
+def test_parallel_output_matches_sequential(tmp_path, capsys):
+    # Esattamente una finestra piena di percorsi, poi solo linee invariate:
+    # l'ultima finestra non contiene percorsi
+    paths = "".join(
+        f"G0 X0 Y{i}\nG1 X20 Y{i} E{i + 1}.0 F1800\n"
+        for i in range(PARALLEL_WINDOW_PATHS)
+    )
+    input_path = tmp_path / "input.gcode"
+    input_path.write_text("G92 E0\n" + paths + "G0 X0 Y0\nM107\n")
+
+    results = [
+        GCodeProcessor(ProcessorConfig(workers=workers)).process_file(
+            str(input_path), None, return_content=True
+        )
+        for workers in (1, 2)
+    ]
+
+    (sequential, sequential_content), (parallel, parallel_content) = results
+    assert parallel_content == sequential_content
+    assert parallel_content.endswith(b"G0 X0 Y0\nM107\n")
+    assert parallel.paths_processed == sequential.paths_processed == PARALLEL_WINDOW_PATHS
+    assert parallel.output_lines == sequential.output_lines
+
+
+def test_smoothing_leaves_analyzed_commands_unchanged(capsys):
+    parser = GCodeParser()
+    commands = [
+        parser.parse_line(line, num)
+        for num, line in enumerate(GCODE.splitlines(), start=1)
+    ]
+    processor = GCodeProcessor(ProcessorConfig(segment_resolution=100.0))
+    path = processor.analyzer.analyze(commands)[-1]
+
+    smoothed = processor._apply_smoothing_to_path(path)
+
+    # Il movimento non segmentato è una copia con il feedrate modificato
+    assert any(not isinstance(line, str) for line in smoothed)
+    for cmd in commands:
+        assert not cmd._modified
+        assert cmd.feedrate_override is None
+        assert cmd.to_gcode() == cmd.raw_line
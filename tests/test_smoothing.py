@@ -0,0 +1,30 @@
+"""Test delle curve di smoothing."""
+
+import numpy as np
+import pytest
+
+from src.smoothing import CurveType, apply_curve, apply_curve_array
+
+PROGRESS = np.array([-0.5, 0.0, 0.1, 0.3, 0.5, 0.77, 0.999, 1.0, 2.0])
+
+
+@pytest.mark.parametrize("curve_type", list(CurveType))
+def test_scalar_matches_array(curve_type):
+    values = apply_curve_array(PROGRESS, curve_type)
+
+    # math e NumPy possono arrotondare diversamente l'ultima cifra
+    assert [apply_curve(p, curve_type) for p in PROGRESS.tolist()] == pytest.approx(
+        values.tolist(), rel=1e-14, abs=1e-15
+    )
+
+
+@pytest.mark.parametrize("curve_type", list(CurveType))
+def test_curve_endpoints(curve_type):
+    values = apply_curve_array(np.array([0.0, 1.0]), curve_type)
+
+    if curve_type is CurveType.SIGMOID:
+        # La sigmoide non passa esattamente per 0 e 1
+        assert values[0] == pytest.approx(0.0, abs=0.01)
+        assert values[1] == pytest.approx(1.0, abs=0.01)
+    else:
+        assert values.tolist() == [0.0, 1.0]
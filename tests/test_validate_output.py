@@ -0,0 +1,39 @@
+"""Test dell'analisi di validate_output, sequenziale e a blocchi."""
+
+import pytest
+
+from validate_output import analyze_file
+
+# Cambi di modalità e reset distribuiti lungo il file, così che i confini
+# dei blocchi cadano in stati diversi
+GCODE = "".join(
+    f"M8{2 + i % 2}\n"
+    f"G92 E{i * 0.1:.1f}\n"
+    + "".join(f"G1 X{j} Y{i} E{0.3 + j * 0.7:.4f} F{600 + j}\n" for j in range(40))
+    + "  G1 X0 Y0 E-.5 ;RAMP_DOWN 10%\n"
+    for i in range(12)
+)
+
+
+@pytest.mark.parametrize("workers", [2, 3, 7])
+def test_parallel_analysis_matches_sequential(tmp_path, workers):
+    path = tmp_path / "input.gcode"
+    path.write_text(GCODE)
+
+    sequential = analyze_file(str(path))
+    parallel = analyze_file(str(path), workers=workers)
+
+    assert sequential["extrusion_moves"] > 0
+    # total_e somma i parziali dei blocchi: uguale salvo arrotondamenti
+    assert parallel.pop("total_e") == pytest.approx(sequential.pop("total_e"), rel=1e-12)
+    assert parallel == sequential
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.gcode"
+    path.write_text("")
+
+    stats = analyze_file(str(path), workers=2)
+
+    assert stats["total_lines"] == 0
+    assert stats["total_e"] == 0.0
@@ -7,118 +7,315 @@ Controlla:
 3. Feedrate nei range attesi
 """
 
+import argparse
+import mmap
+import os
 import re
-import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional, Tuple
+
+# Pattern precompilati per i parametri
+PARAM_PATTERN = re.compile(r"([A-Z])(-?\.?\d+\.?\d*)")
+# Solo E ed F, sui byte: stessi match di PARAM_PATTERN per queste lettere
+# (i numeri non contengono lettere, quindi nessun match si sovrappone)
+EF_PATTERN = re.compile(rb"([EF])(-?\.?\d+\.?\d*)")
+
+# Spazi iniziali rimossi prima dei controlli sul prefisso (quelli ASCII
+# che rimuoverebbe str.strip)
+LEADING_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
 
 
 def parse_gcode_line(line: str) -> dict:
     """Estrae parametri da una linea G-code."""
-    result = {"raw": line.strip()}
+    raw = line.strip()
+    result = {"raw": raw}
     
-    # Pattern per parametri
-    param_pattern = re.compile(r"([A-Z])(-?\.?\d+\.?\d*)")
-    
-    # Estrai comando
-    parts = line.strip().split()
-    if parts and parts[0].startswith("G"):
-        result["command"] = parts[0]
+    # Estrai comando (primo token, se è un G-code)
+    if raw[:1] == "G":
+        result["command"] = raw.split(None, 1)[0]
     
     # Estrai parametri
-    for match in param_pattern.finditer(line):
-        param = match.group(1)
-        value = float(match.group(2))
-        result[param] = value
+    for param, value in PARAM_PATTERN.findall(line):
+        result[param] = float(value)
     
     return result
 
 
-def analyze_file(filepath: str) -> dict:
-    """Analizza un file G-code e restituisce statistiche."""
-    stats = {
+def _parse_e_f(line: bytes) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Estrae solo E ed F da una linea G-code (ultimo valore di ciascuno).
+    
+    Equivale a leggere "E" e "F" da parse_gcode_line, senza costruire
+    il dizionario di tutti i parametri.
+    """
+    e_val = f_val = None
+    for param, value in EF_PATTERN.findall(line):
+        if param == b"E":
+            e_val = float(value)
+        else:
+            f_val = float(value)
+    return e_val, f_val
+
+
+def _new_stats() -> dict:
+    """Statistiche iniziali (vuote) di un file o di un suo blocco."""
+    return {
         "total_lines": 0,
         "g1_lines": 0,
         "extrusion_moves": 0,
         "total_e": 0.0,
         "min_feedrate": float("inf"),
         "max_feedrate": 0.0,
-        "feedrates": [],
         "smoothing_blocks": 0,
         "ramp_up_moves": 0,
         "ramp_down_moves": 0,
         "steady_moves": 0,
     }
+
+
+def _scan_range(
+    filepath: str,
+    start: int,
+    end: int,
+    relative_extrusion: bool,
+    current_e: Optional[float]
+) -> Tuple[dict, Optional[Tuple[float, float]], Optional[float]]:
+    """
+    Analizza le linee del file comprese tra gli offset start ed end.
     
-    relative_extrusion = False
-    current_e = 0.0
+    Args:
+        filepath: Percorso del file
+        start: Offset di inizio (inizio di una linea)
+        end: Offset di fine (inizio di una linea o fine del file)
+        relative_extrusion: Modalità di estrusione in vigore a start
+        current_e: Valore di E in vigore a start (None = sconosciuto)
+        
+    Returns:
+        Tuple (stats, pending, current_e): pending è (E estruso prima, valore)
+        del primo E assoluto letto con current_e sconosciuto, il cui
+        contributo dipende dal valore precedente (in quel caso total_e in
+        stats conta solo gli incrementi successivi); current_e è il valore
+        finale
+    """
+    # Contatori in variabili locali durante la scansione (niente accessi
+    # al dizionario per linea): il dizionario viene costruito alla fine
+    total_lines = g1_lines = extrusion_moves = smoothing_blocks = 0
+    ramp_up_moves = ramp_down_moves = steady_moves = 0
+    total_e = 0.0
+    min_feedrate = float("inf")
+    max_feedrate = 0.0
+    pending = None
+    
+    # Mappa solo il blocco richiesto (l'offset deve essere allineato alla
+    # granularità di allocazione): readline si ferma da sola a end
+    offset = start - start % mmap.ALLOCATIONGRANULARITY
     
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            stats["total_lines"] += 1
-            line = line.strip()
+    # Scandisce i byte senza decodifica (il G-code è ASCII). I controlli
+    # successivi non dipendono dagli spazi finali, quindi basta rimuovere
+    # quelli iniziali (rari) invece di strip()
+    with open(filepath, "rb") as f, \
+            mmap.mmap(f.fileno(), end - offset, access=mmap.ACCESS_READ, offset=offset) as mm:
+        mm.seek(start - offset)
+        for line in iter(mm.readline, b""):
+            total_lines += 1
+            if line[:1] in LEADING_WHITESPACE:
+                line = line.lstrip(LEADING_WHITESPACE)
             
             # Rileva modalità estrusione
-            if line.startswith("M83"):
+            if line.startswith(b"M83"):
                 relative_extrusion = True
-            elif line.startswith("M82"):
+            elif line.startswith(b"M82"):
                 relative_extrusion = False
-            elif line.startswith("G92") and "E" in line:
+            elif line.startswith(b"G92") and b"E" in line:
                 # Reset E
-                parsed = parse_gcode_line(line)
-                if "E" in parsed:
-                    current_e = parsed["E"]
+                e_val, _ = _parse_e_f(line)
+                if e_val is not None:
+                    current_e = e_val
+            
+            # I marker stanno nei commenti: le linee senza ';' (la gran
+            # parte) saltano tutte le ricerche, le altre cercano dal ';'
+            comment_start = line.find(b";")
             
             # Conta blocchi smoothing
-            if "PRESSURE_SMOOTHING_START" in line:
-                stats["smoothing_blocks"] += 1
+            if comment_start >= 0 and line.find(b"PRESSURE_SMOOTHING_START", comment_start) >= 0:
+                smoothing_blocks += 1
             
             # Analizza movimenti G1
-            if line.startswith("G1"):
-                stats["g1_lines"] += 1
-                parsed = parse_gcode_line(line)
+            if line.startswith(b"G1"):
+                g1_lines += 1
+                e_val, f_val = _parse_e_f(line)
                 
                 # Feedrate
-                if "F" in parsed:
-                    f_val = parsed["F"]
-                    stats["feedrates"].append(f_val)
-                    stats["min_feedrate"] = min(stats["min_feedrate"], f_val)
-                    stats["max_feedrate"] = max(stats["max_feedrate"], f_val)
+                if f_val is not None:
+                    if f_val < min_feedrate:
+                        min_feedrate = f_val
+                    if f_val > max_feedrate:
+                        max_feedrate = f_val
                 
                 # Estrusione
-                if "E" in parsed:
-                    e_val = parsed["E"]
+                if e_val is not None:
                     if relative_extrusion:
                         if e_val > 0:
-                            stats["total_e"] += e_val
-                            stats["extrusion_moves"] += 1
+                            total_e += e_val
+                            extrusion_moves += 1
                     else:
-                        if e_val > current_e:
-                            stats["total_e"] += (e_val - current_e)
-                            stats["extrusion_moves"] += 1
+                        if current_e is None:
+                            pending = (total_e, e_val)
+                            total_e = 0.0
+                        elif e_val > current_e:
+                            total_e += e_val - current_e
+                            extrusion_moves += 1
                         current_e = e_val
                 
                 # Conta fasi smoothing
-                if "RAMP_UP" in line:
-                    stats["ramp_up_moves"] += 1
-                elif "RAMP_DOWN" in line:
-                    stats["ramp_down_moves"] += 1
-                elif "STEADY" in line:
-                    stats["steady_moves"] += 1
+                if comment_start >= 0:
+                    if line.find(b"RAMP_UP", comment_start) >= 0:
+                        ramp_up_moves += 1
+                    elif line.find(b"RAMP_DOWN", comment_start) >= 0:
+                        ramp_down_moves += 1
+                    elif line.find(b"STEADY", comment_start) >= 0:
+                        steady_moves += 1
+    
+    # Chiavi e valori iniziali sono definiti solo in _new_stats
+    stats = _new_stats()
+    stats.update(
+        total_lines=total_lines,
+        g1_lines=g1_lines,
+        extrusion_moves=extrusion_moves,
+        total_e=total_e,
+        min_feedrate=min_feedrate,
+        max_feedrate=max_feedrate,
+        smoothing_blocks=smoothing_blocks,
+        ramp_up_moves=ramp_up_moves,
+        ramp_down_moves=ramp_down_moves,
+        steady_moves=steady_moves,
+    )
+    return stats, pending, current_e
+
+
+def _relative_extrusion_at(mm: mmap.mmap, end: int) -> bool:
+    """
+    Modalità di estrusione in vigore all'offset end (inizio di una linea).
+    
+    Cerca all'indietro l'ultimo M82/M83 che apre una linea (dopo eventuali
+    spazi iniziali), come li riconosce la scansione in avanti.
+    """
+    pos = end
+    while True:
+        m82 = mm.rfind(b"M82", 0, pos)
+        m83 = mm.rfind(b"M83", 0, pos)
+        found = max(m82, m83)
+        if found < 0:
+            return False
+        
+        line_start = mm.rfind(b"\n", 0, found) + 1
+        if not mm[line_start:found].lstrip(LEADING_WHITESPACE):
+            return found == m83
+        pos = found
+
+
+def _analyze_chunk(
+    filepath: str,
+    start: int,
+    end: int
+) -> Tuple[dict, Optional[Tuple[float, float]], Optional[float]]:
+    """Analizza un blocco del file in un worker (E iniziale sconosciuto)."""
+    with open(filepath, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        relative_extrusion = _relative_extrusion_at(mm, start)
+    return _scan_range(filepath, start, end, relative_extrusion, None)
+
+
+def _merge_chunks(results) -> dict:
+    """
+    Unisce i risultati di _scan_range dei blocchi, in ordine di file.
+    
+    Il primo E assoluto di ogni blocco viene risolto con il valore finale
+    del blocco precedente. Le somme parziali di E sono sommate in ordine
+    fisso, ma con raggruppamenti diversi da una scansione sequenziale:
+    total_e può differire da quella nelle ultime cifre.
+    """
+    stats = _new_stats()
+    current_e = 0.0
+    for chunk_stats, pending, end_e in results:
+        if pending is not None:
+            extruded_before, pending_e = pending
+            stats["total_e"] += extruded_before
+            if pending_e > current_e:
+                stats["total_e"] += pending_e - current_e
+                stats["extrusion_moves"] += 1
+        if end_e is not None:
+            current_e = end_e
+        
+        for key, value in chunk_stats.items():
+            if key == "min_feedrate":
+                if value < stats[key]:
+                    stats[key] = value
+            elif key == "max_feedrate":
+                if value > stats[key]:
+                    stats[key] = value
+            else:
+                stats[key] += value
     
     return stats
 
 
-def compare_files(input_file: str, output_file: str):
+def _chunk_bounds(filepath: str, size: int, chunks: int) -> list:
+    """Divide il file in blocchi di byte allineati all'inizio delle linee."""
+    bounds = [0]
+    with open(filepath, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, chunks):
+            # Inizio della prima linea che parte a size*i/chunks o dopo
+            newline = mm.find(b"\n", size * i // chunks - 1)
+            bound = size if newline < 0 else newline + 1
+            if bound > bounds[-1]:
+                bounds.append(bound)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def analyze_file(filepath: str, workers: int = 1) -> dict:
+    """
+    Analizza un file G-code e restituisce statistiche.
+    
+    Con workers > 1 il file viene diviso in blocchi di linee analizzati in
+    processi separati; i risultati coincidono con l'analisi sequenziale,
+    salvo arrotondamenti di total_e nelle ultime cifre.
+    """
+    size = os.path.getsize(filepath)
+    
+    # mmap non può mappare un file vuoto
+    if size == 0:
+        return _new_stats()
+    
+    if workers <= 1:
+        stats, _, _ = _scan_range(filepath, 0, size, False, 0.0)
+        return stats
+    
+    bounds = _chunk_bounds(filepath, size, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _merge_chunks(executor.map(
+            _analyze_chunk,
+            [filepath] * len(bounds),
+            [start for start, _ in bounds],
+            [end for _, end in bounds]
+        ))
+
+
+def compare_files(input_file: str, output_file: str, workers: int = 1):
     """Confronta input e output per validare il processing."""
     print("=" * 60)
     print("VALIDAZIONE POST-PROCESSING")
     print("=" * 60)
     
     print(f"\nAnalisi INPUT: {input_file}")
-    input_stats = analyze_file(input_file)
+    input_stats = analyze_file(input_file, workers)
     
     print(f"Analisi OUTPUT: {output_file}")
-    output_stats = analyze_file(output_file)
+    output_stats = analyze_file(output_file, workers)
     
     # Report
     print("\n" + "-" * 60)
@@ -178,11 +375,27 @@ def compare_files(input_file: str, output_file: str):
 
 
 if __name__ == "__main__":
-    input_file = "examples/D02_PETG_9h52m.gcode"
-    output_file = "examples/output_test.gcode"
-    
-    if len(sys.argv) >= 3:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2]
+    parser = argparse.ArgumentParser(
+        description="Validazione del post-processing (confronto input/output)"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="examples/D02_PETG_9h52m.gcode",
+        help="File G-code di input"
+    )
+    parser.add_argument(
+        "output",
+        nargs="?",
+        default="examples/output_test.gcode",
+        help="File G-code processato"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processi per l'analisi dei file (default: 1)"
+    )
+    args = parser.parse_args()
     
-    compare_files(input_file, output_file)
+    compare_files(args.input, args.output, args.workers)